@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryPlanMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiQueryPlanTests(QueryPlanMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {i}',
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(15)
+        ]
+        for _ in range(3):
+            Comment.objects.create(
+                post=cls.posts[0], author=cls.reader, text='Комментарий'
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def test_endpoints_use_indexes(self):
+        client = Client()
+        client.force_login(self.reader)
+        post_id = self.posts[0].pk
+        urls = [
+            reverse('api:posts'),
+            reverse('api:posts_batch') + f'?ids={post_id},{post_id + 1}',
+            reverse('api:post_detail', args=[post_id]),
+            reverse('api:post_comments', args=[post_id]) + '?limit=2',
+            reverse('api:group', args=['group']),
+            reverse('api:group_posts', args=['group']),
+            reverse('api:profile', args=['author']),
+            reverse('api:profile_posts', args=['author']),
+            reverse('api:follow_posts'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertQueryPlansUseIndexes(url, client)
+                next_url = client.get(url).json().get('next')
+                if next_url:
+                    self.assertQueryPlansUseIndexes(
+                        f'{url.split("?")[0]}?limit=2&cursor={next_url}',
+                        client,
+                    )
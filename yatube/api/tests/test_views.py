@@ -0,0 +1,115 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {i}',
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(15)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+
+    def get(self, name, data=None, client=None, **kwargs):
+        response = (client or self.client).get(
+            reverse(f'api:{name}', kwargs=kwargs), data
+        )
+        return response.status_code, response.json()
+
+    def read_all(self, name, **kwargs):
+        status, page = self.get(name, {'limit': 4}, **kwargs)
+        ids = [item['id'] for item in page['results']]
+        while page['next']:
+            status, page = self.get(
+                name, {'limit': 4, 'cursor': page['next']}, **kwargs
+            )
+            ids.extend(item['id'] for item in page['results'])
+        return ids
+
+    def test_post_lists_follow_cursors(self):
+        newest_first = [post.pk for post in reversed(self.posts)]
+        self.assertEqual(self.read_all('posts'), newest_first)
+        self.assertEqual(
+            self.read_all('profile_posts', username='author'), newest_first
+        )
+        self.assertEqual(
+            self.read_all('group_posts', slug='group'),
+            [post.pk for post in reversed(self.posts) if post.group_id]
+        )
+
+    def test_sparse_fields(self):
+        status, page = self.get('posts', {'fields': 'id,author'})
+        self.assertEqual(set(page['results'][0]), {'id', 'author'})
+        self.assertEqual(page['results'][0]['author'], 'author')
+        status, data = self.get('posts', {'fields': 'id,password'})
+        self.assertEqual(status, 400)
+        self.assertIn('password', data['error'])
+
+    def test_image_url_comes_from_field_storage(self):
+        post = self.posts[0]
+        Post.objects.filter(pk=post.pk).update(image='posts/ab/abc.jpg')
+        storage = mock.Mock()
+        storage.url.side_effect = lambda name: f'https://cdn.test/{name}'
+        with mock.patch.object(Post._meta.get_field('image'), 'storage',
+                               storage):
+            status, data = self.get('post_detail', post_id=post.pk)
+        self.assertEqual(data['image'], 'https://cdn.test/posts/ab/abc.jpg')
+
+    def test_detail_comments_and_profile(self):
+        post = self.posts[0]
+        status, data = self.get('post_detail', post_id=post.pk)
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(data['comments_count'], 1)
+        self.assertIsNone(data['image'])
+        status, page = self.get('post_comments', post_id=post.pk)
+        self.assertEqual(page['results'][0]['author'], 'reader')
+        status, data = self.get('profile', username='author')
+        self.assertEqual(data['full_name'], 'Лев Толстой')
+        self.assertEqual(data['posts_count'], 15)
+        self.assertEqual(data['followers_count'], 1)
+        status, data = self.get('group', slug='group')
+        self.assertEqual(data['title'], 'Группа')
+        status, _ = self.get('post_detail', post_id=10 ** 6)
+        self.assertEqual(status, 404)
+
+    def test_follow_feed_requires_login(self):
+        status, _ = self.get('follow_posts')
+        self.assertEqual(status, 401)
+        client = Client()
+        client.force_login(self.reader)
+        status, page = self.get('follow_posts', client=client)
+        self.assertEqual(page['results'][0]['id'], self.posts[-1].pk)
+
+    def test_batch_fetches_posts_in_one_query(self):
+        ids = [self.posts[3].pk, self.posts[1].pk, 10 ** 6]
+        with CaptureQueriesContext(connection) as queries:
+            status, data = self.get(
+                'posts_batch', {'ids': ','.join(map(str, ids)),
+                                'fields': 'id,text'}
+            )
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([item['id'] for item in data['results']], ids[:2])
+        self.assertEqual(data['missing'], [10 ** 6])
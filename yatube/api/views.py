@@ -0,0 +1,239 @@
+"""Read-only JSON API для мобильного клиента.
+
+Ответы строятся прямо из ``.values()``: экземпляры моделей не создаются,
+шаблоны не рендерятся. Параметр ``fields`` оставляет в ответе только
+перечисленные поля, списки постов и комментариев листаются курсором
+``cursor`` по (дата, id), как и HTML-ленты.
+"""
+from functools import wraps
+
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from posts.counters import recount_user
+from posts.models import Comment, Group, Post, TimelineEntry, User
+from posts.utils import (CURSOR_NEXT, POSTS_PER_PAGE, decode_cursor,
+                         encode_cursor, keyset_after)
+
+MAX_LIMIT = 100
+MAX_BATCH = 100
+
+
+def image_url(name):
+    return Post._meta.get_field('image').storage.url(name) if name else None
+
+
+# Поле ответа → (поле выборки, преобразование значения).
+POST_FIELDS = {
+    'id': ('pk', None),
+    'text': ('text', None),
+    'pub_date': ('pub_date', None),
+    'author': ('author__username', None),
+    'group': ('group__slug', None),
+    'image': ('image', image_url),
+    'comments_count': ('comments_count', None),
+}
+COMMENT_FIELDS = {
+    'id': ('pk', None),
+    'post': ('post_id', None),
+    'author': ('author__username', None),
+    'text': ('text', None),
+    'created': ('created', None),
+}
+GROUP_FIELDS = ('slug', 'title', 'description')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view):
+    """GET-обработчик, возвращающий данные, которые станут JSON."""
+    @require_GET
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            data = view(request, *args, **kwargs)
+        except ApiError as error:
+            return json_response({'error': str(error)}, error.status)
+        return json_response(data)
+    return wrapper
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={'ensure_ascii': False}
+    )
+
+
+def selected_fields(request, available):
+    """Поля из ``?fields=a,b``; по умолчанию — все."""
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(available)
+    fields = [field for field in requested.split(',') if field]
+    unknown = set(fields) - set(available)
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get('limit', POSTS_PER_PAGE))
+    except ValueError:
+        raise ApiError('limit должен быть числом')
+    return min(max(limit, 1), MAX_LIMIT)
+
+
+def project(rows, fields, available, prefix=''):
+    """Словари ответа из строк ``.values()`` с полями ``prefix + поле``."""
+    for row in rows:
+        item = {}
+        for field in fields:
+            lookup, convert = available[field]
+            value = row[prefix + lookup]
+            item[field] = convert(value) if convert else value
+        yield item
+
+
+def cursor_page(request, queryset, available, keys=('pub_date', 'pk'),
+                prefix=''):
+    """Страница {'results', 'next'} по keyset-курсору."""
+    fields = selected_fields(request, available)
+    limit = page_limit(request)
+    position = None
+    cursor = request.GET.get('cursor')
+    if cursor:
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            raise ApiError('Некорректный курсор')
+        position = decoded[1:]
+    date_field, id_field = keys
+    lookups = {date_field, id_field} | {
+        prefix + available[field][0] for field in fields
+    }
+    rows = list(
+        keyset_after(queryset, position, date_field, id_field)
+        .values(*lookups)[:limit + 1]
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            CURSOR_NEXT, last[date_field], last[id_field]
+        )
+    return {
+        'results': list(project(rows, fields, available, prefix)),
+        'next': next_cursor,
+    }
+
+
+def get_values(queryset, *fields):
+    row = queryset.values(*fields).first()
+    if row is None:
+        raise ApiError('Не найдено', status=404)
+    return row
+
+
+@api_view
+def posts(request):
+    return cursor_page(request, Post.objects.all(), POST_FIELDS)
+
+
+@api_view
+def group(request, slug):
+    return get_values(Group.objects.filter(slug=slug), *GROUP_FIELDS)
+
+
+@api_view
+def group_posts(request, slug):
+    group = get_values(Group.objects.filter(slug=slug), 'pk')
+    return cursor_page(
+        request, Post.objects.filter(group_id=group['pk']), POST_FIELDS
+    )
+
+
+@api_view
+def profile(request, username):
+    counters = ('posts_count', 'followers_count', 'following_count')
+    row = get_values(
+        User.objects.filter(username=username),
+        'pk', 'username', 'first_name', 'last_name',
+        *(f'counters__{counter}' for counter in counters),
+    )
+    if row['counters__posts_count'] is None:
+        stored = recount_user(row['pk'])
+        for counter in counters:
+            row[f'counters__{counter}'] = getattr(stored, counter)
+    data = {
+        'username': row['username'],
+        'full_name': f'{row["first_name"]} {row["last_name"]}'.strip(),
+    }
+    data.update(
+        (counter, row[f'counters__{counter}']) for counter in counters
+    )
+    return data
+
+
+@api_view
+def profile_posts(request, username):
+    author = get_values(User.objects.filter(username=username), 'pk')
+    return cursor_page(
+        request, Post.objects.filter(author_id=author['pk']), POST_FIELDS
+    )
+
+
+@api_view
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        raise ApiError('Нужна авторизация', status=401)
+    return cursor_page(
+        request, TimelineEntry.objects.filter(user=request.user),
+        POST_FIELDS, keys=('pub_date', 'post_id'), prefix='post__',
+    )
+
+
+@api_view
+def post_detail(request, post_id):
+    fields = selected_fields(request, POST_FIELDS)
+    row = get_values(
+        Post.objects.filter(pk=post_id),
+        *{POST_FIELDS[field][0] for field in fields},
+    )
+    return next(project([row], fields, POST_FIELDS))
+
+
+@api_view
+def post_comments(request, post_id):
+    get_values(Post.objects.filter(pk=post_id), 'pk')
+    return cursor_page(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        keys=('created', 'pk'),
+    )
+
+
+@api_view
+def posts_batch(request):
+    """Много постов по ``?ids=1,2,3`` за один запрос, в порядке ids."""
+    try:
+        ids = [int(pk) for pk in request.GET.get('ids', '').split(',') if pk]
+    except ValueError:
+        raise ApiError('ids должны быть числами через запятую')
+    if len(ids) > MAX_BATCH:
+        raise ApiError(f'Не больше {MAX_BATCH} постов за запрос')
+    fields = selected_fields(request, POST_FIELDS)
+    lookups = {'pk'} | {POST_FIELDS[field][0] for field in fields}
+    rows = {
+        row['pk']: row
+        for row in Post.objects.filter(pk__in=ids).order_by()
+        .values(*lookups)
+    }
+    found = [rows[pk] for pk in dict.fromkeys(ids) if pk in rows]
+    return {
+        'results': list(project(found, fields, POST_FIELDS)),
+        'missing': [pk for pk in dict.fromkeys(ids) if pk not in rows],
+    }
@@ -0,0 +1,71 @@
+"""Профиль SQLite для продакшена.
+
+С настройками по умолчанию SQLite ведёт журнал отката: пока идёт запись,
+читатели ждут, а под нагрузкой запросы получают «database is locked».
+Каждое новое соединение с SQLite получает PRAGMA из SQLITE_PRAGMAS.
+Профиль yatube.settings_production задаёт в них WAL (читатели не ждут
+пишущего и наоборот), ``synchronous = NORMAL`` (в режиме WAL это
+безопасно при падении процесса), ``busy_timeout``, размер кеша страниц
+и ``mmap_size``; базовые настройки оставляют SQLite по умолчанию.
+
+ReplicaRouter отправляет чтения в соединение REPLICA — тот же файл,
+открытый только для чтения (его добавляет профиль
+yatube.settings_production), — а записи в основное. Внутри транзакции
+основного соединения чтения остаются в нём, чтобы видеть свои же
+незафиксированные изменения.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Обработчик connection_created."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = settings.SQLITE_PRAGMAS
+    if connection.alias == REPLICA:
+        # Режим журнала хранится в самом файле, его задаёт основное
+        # соединение; читающему он недоступен для записи.
+        pragmas = {name: value for name, value in pragmas.items()
+                   if name != 'journal_mode'}
+        pragmas['query_only'] = 1
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)
+
+
+def has_replica():
+    """Есть ли отдельное читающее соединение.
+
+    В тестах REPLICA — зеркало основной базы с теми же настройками:
+    тогда читать нужно через основное соединение.
+    """
+    if REPLICA not in connections.databases:
+        return False
+    primary = connections[DEFAULT_DB_ALIAS]
+    return connections[REPLICA].settings_dict is not primary.settings_dict
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not has_replica():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Обе базы — один и тот же файл.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db != REPLICA
@@ -0,0 +1,60 @@
+"""«Дырки» в закешированных страницах для персональных кусков.
+
+Страница кешируется одна на всех, а то, что зависит от зрителя (шапка с
+именем пользователя, ссылки «редактировать», CSRF-токен, кнопка
+подписки), выводится тегом ``{% hole 'имя' аргументы %}``. Пока view
+рендерит страницу для кеша (внутри ``deferred(request)``), тег оставляет
+метку ``<!--hole:имя аргументы-->``; ``fill`` перед ответом заменяет
+метки результатом зарегистрированной функции ``(request, *аргументы)``.
+Вне ``deferred`` тег сразу выводит результат функции.
+
+Аргументы меток — строки: функция получает их в виде строк.
+"""
+import re
+from contextlib import contextmanager
+from urllib.parse import quote, unquote
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+HOLE_RE = re.compile(r'<!--hole:(\w+)((?: [^ >]*)*)-->')
+
+_holes = {}
+
+
+def register(name):
+    """Регистрирует функцию, заполняющую дырку ``name``."""
+    def decorator(function):
+        _holes[name] = function
+        return function
+    return decorator
+
+
+@contextmanager
+def deferred(request):
+    """Внутри блока теги hole оставляют метки вместо содержимого."""
+    request.defer_holes = True
+    try:
+        yield
+    finally:
+        request.defer_holes = False
+
+
+def hole(request, name, *args):
+    if getattr(request, 'defer_holes', False):
+        encoded = ''.join(f' {quote(str(arg), safe="")}' for arg in args)
+        return mark_safe(f'<!--hole:{name}{encoded}-->')
+    return _holes[name](request, *map(str, args))
+
+
+def fill(request, content):
+    """Заменяет метки в ``content`` содержимым для этого зрителя."""
+    def replace(match):
+        args = [unquote(arg) for arg in match[2].split()]
+        return str(_holes[match[1]](request, *args))
+    return HOLE_RE.sub(replace, content)
+
+
+@register('header')
+def header(request):
+    return render_to_string('includes/_header.html', request=request)
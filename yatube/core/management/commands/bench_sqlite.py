@@ -0,0 +1,130 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import quote
+
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas
+from yatube import settings_production
+
+SCHEMA = [
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER, '
+    'text TEXT, created REAL)',
+    'CREATE INDEX comment_post_created ON comment (post_id, created)',
+]
+READ_SQL = (
+    'SELECT id, text FROM comment WHERE post_id = ? '
+    'ORDER BY created DESC LIMIT 10'
+)
+WRITE_SQL = 'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)'
+POSTS = 100
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает чтения SQLite под непрерывной записью комментариев: '
+        'настройки по умолчанию и профиль продакшена (SQLITE_PRAGMAS '
+        'из yatube.settings_production, '
+        'чтения через отдельное соединение только для чтения). База '
+        'создаётся во временном каталоге.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=4,
+                            help='Сколько потоков читают.')
+        parser.add_argument('--writers', type=int, default=2,
+                            help='Сколько потоков пишут.')
+        parser.add_argument('--seconds', type=float, default=3)
+        parser.add_argument('--rows', type=int, default=20000,
+                            help='Сколько комментариев в базе заранее.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"профиль":>10} {"чтений/с":>10} {"записей/с":>10} '
+            f'{"locked":>7}'
+        )
+        results = {}
+        for profile in ('default', 'production'):
+            with tempfile.TemporaryDirectory() as directory:
+                results[profile] = self.run(
+                    profile, os.path.join(directory, 'bench.sqlite3'),
+                    options,
+                )
+            reads, writes, locked = results[profile]
+            self.stdout.write(
+                f'{profile:>10} {reads:>10.0f} {writes:>10.0f} {locked:>7}'
+            )
+        gain = results['production'][0] / max(results['default'][0], 1)
+        self.stdout.write(f'Чтений больше в {gain:.1f} раза.')
+
+    def connect(self, profile, path, read_only=False):
+        if profile == 'default':
+            return sqlite3.connect(path, timeout=5, check_same_thread=False)
+        pragmas = dict(settings_production.SQLITE_PRAGMAS)
+        if read_only:
+            path = f'file:{quote(path)}?mode=ro'
+            pragmas.pop('journal_mode')
+            pragmas['query_only'] = 1
+        connection = sqlite3.connect(path, timeout=5, uri=True,
+                                     check_same_thread=False)
+        apply_pragmas(connection.cursor(), pragmas)
+        return connection
+
+    def run(self, profile, path, options):
+        connection = self.connect(profile, path)
+        for sql in SCHEMA:
+            connection.execute(sql)
+        connection.executemany(WRITE_SQL, (
+            (i % POSTS, 'Комментарий', i) for i in range(options['rows'])
+        ))
+        connection.commit()
+        connection.close()
+
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        threads = (
+            [threading.Thread(target=self.work,
+                              args=(self.connect(profile, path, True), read))
+             for _ in range(options['readers'])]
+            + [threading.Thread(target=self.work,
+                                args=(self.connect(profile, path), write))
+               for _ in range(options['writers'])]
+        )
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        self.stop.set()
+        for thread in threads:
+            thread.join()
+        seconds = options['seconds']
+        return (self.counts['read'] / seconds,
+                self.counts['write'] / seconds, self.counts['locked'])
+
+    def work(self, connection, operation):
+        while not self.stop.is_set():
+            try:
+                operation(connection)
+            except sqlite3.OperationalError:
+                key = 'locked'
+            else:
+                key = operation.__name__
+            with self.lock:
+                self.counts[key] += 1
+        connection.close()
+
+
+def read(connection):
+    connection.execute(READ_SQL, (random.randrange(POSTS),)).fetchall()
+
+
+def write(connection):
+    with connection:
+        connection.execute(WRITE_SQL, (
+            random.randrange(POSTS), 'Новый комментарий', time.time(),
+        ))
@@ -0,0 +1,165 @@
+"""Отдача загруженных файлов (MEDIA_ROOT) в продакшене.
+
+По умолчанию файл отдаёт сам Django: с Range, ETag и If-Modified-Since,
+а тело уходит через FileResponse, то есть через ``wsgi.file_wrapper``,
+и сервер вроде gunicorn отправляет его через sendfile. Если впереди стоит
+прокси, MEDIA_SENDFILE = 'x-accel-redirect' (nginx) или 'x-sendfile'
+(Apache, lighttpd) отдаёт ему только путь к файлу, и байты картинок вовсе
+не проходят через воркеры Python.
+
+Файлы, имя которых начинается с SHA-256 содержимого (картинки постов из
+posts.storage и их варианты), под этим именем никогда не меняются и
+отдаются с ``Cache-Control: immutable``.
+"""
+import mimetypes
+import os
+import re
+from stat import S_ISREG
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from .staticfiles import IMMUTABLE
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CONTENT_HASHED_RE = re.compile(r'^[0-9a-f]{64}[._]')
+
+
+class RangeFile:
+    """Кусок файла [start, start + length) как файловый объект.
+
+    ``fileno`` остаётся от файла: sendfile начнёт с текущей позиции и
+    отправит Content-Length байт.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """(start, end) включительно, None для всего файла, ValueError — 416.
+
+    Поддерживается один диапазон; на несколько сразу (bytes=0-1,5-6)
+    по RFC 7233 можно ответить всем файлом.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        suffix = int(last)
+        if suffix == 0:
+            raise ValueError(header)
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError(header)
+    if start > end:
+        return None
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def sendfile_response(path, name, content_type):
+    """Пустой ответ, файл по которому отдаст прокси."""
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(name)
+        )
+    else:
+        response['X-Sendfile'] = path
+    return response
+
+
+def file_response(request, path, stat, content_type):
+    size = stat.st_size
+    last_modified = int(stat.st_mtime)
+    etag = f'"{size:x}-{stat.st_mtime_ns:x}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is not None:
+        return response
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and if_range_matches(
+        request, etag, last_modified
+    ):
+        try:
+            byte_range = parse_range(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    media_file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(media_file, content_type=content_type)
+        response['Content-Length'] = size
+    else:
+        start, end = byte_range
+        response = FileResponse(
+            RangeFile(media_file, start, end - start + 1),
+            content_type=content_type, status=206,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+@require_safe
+def serve(request, path):
+    """Файл из MEDIA_ROOT по пути относительно MEDIA_URL."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404(path)
+    try:
+        stat = os.stat(full_path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404(path)
+    if not S_ISREG(stat.st_mode):
+        raise Http404(path)
+    content_type, _ = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    if settings.MEDIA_SENDFILE:
+        response = sendfile_response(full_path, path, content_type)
+    else:
+        response = file_response(request, full_path, stat, content_type)
+    if CONTENT_HASHED_RE.match(os.path.basename(full_path)):
+        response['Cache-Control'] = IMMUTABLE
+    return response
@@ -0,0 +1,11 @@
+"""Помощники для пулов процессов, запускаемых методом spawn.
+
+Модуль не импортирует ничего из Django на верхнем уровне: инициализатор
+пула загружается в дочернем процессе раньше, чем настроены приложения.
+"""
+
+
+def setup_django():
+    """Инициализатор процесса пула: загружает настройки и приложения."""
+    import django
+    django.setup()
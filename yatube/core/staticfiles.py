@@ -0,0 +1,203 @@
+"""Статика для продакшена: хеши в именах, предсжатые копии и WSGI-отдача.
+
+``collectstatic`` с ManifestStaticFilesStorage складывает в STATIC_ROOT
+файлы с хешем содержимого в имени и рядом пишет ``.gz`` и, если
+установлен пакет brotli, ``.br``. ``StaticFilesMiddleware`` оборачивает
+WSGI-приложение и отдаёт эти файлы сам, не доходя до Django: файлы с
+хешем — с кешированием на год (immutable), копию выбирает по
+Accept-Encoding, а тело передаёт через ``wsgi.file_wrapper``, чтобы
+сервер мог отправить файл через sendfile.
+"""
+import gzip
+import mimetypes
+import os
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.utils.http import http_date, parse_http_date_safe
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.svg', '.ico', '.txt', '.json', '.map')
+# Сжатая копия, которая экономит меньше 5 %, не стоит второго файла.
+MIN_RATIO = 0.95
+# (кодировка, расширение копии) в порядке предпочтения.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+MUTABLE = 'public, max-age=60'
+BLOCK_SIZE = 64 * 1024
+
+
+def compress(data):
+    """{расширение: сжатые данные} для доступных кодировок."""
+    variants = {'.gz': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data)
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хеши в именах плюс ``.gz``/``.br`` копии текстовых файлов."""
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic ещё не запускали (разработка, тесты):
+            # отдаём исходное имя вместо ошибки в шаблоне.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE):
+                self.write_compressed(name)
+
+    def write_compressed(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        for extension, compressed in compress(data).items():
+            if len(compressed) < len(data) * MIN_RATIO:
+                with open(path + extension, 'wb') as target:
+                    target.write(compressed)
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    encodings = set()
+    for part in header.split(','):
+        coding, *params = (item.strip() for item in part.split(';'))
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            encodings.add(coding.lower())
+    return encodings
+
+
+class StaticFile:
+    """Файл из STATIC_ROOT с заранее посчитанными заголовками."""
+
+    def __init__(self, path, immutable):
+        self.path = path
+        stat = os.stat(path)
+        self.mtime = int(stat.st_mtime)
+        self.etag = f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+        content_type, _ = mimetypes.guess_type(path)
+        content_type = content_type or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type.endswith(
+            ('javascript', 'json', 'svg+xml')
+        ):
+            content_type += '; charset=utf-8'
+        self.headers = [
+            ('Content-Type', content_type),
+            ('Cache-Control', IMMUTABLE if immutable else MUTABLE),
+            ('Last-Modified', http_date(self.mtime)),
+        ]
+        self.variants = {
+            encoding: (path + extension, os.path.getsize(path + extension))
+            for encoding, extension in ENCODINGS
+            if os.path.exists(path + extension)
+        }
+        self.variants[None] = path, stat.st_size
+        if len(self.variants) > 1:
+            self.headers.append(('Vary', 'Accept-Encoding'))
+
+    def choose(self, accept_encoding):
+        encodings = accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and encoding in encodings:
+                return encoding
+        return None
+
+    def not_modified(self, environ, etag):
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            tags = {tag.strip() for tag in if_none_match.split(',')}
+            return etag in tags or '*' in tags
+        since = parse_http_date_safe(environ.get('HTTP_IF_MODIFIED_SINCE'))
+        return since is not None and self.mtime <= since
+
+    def respond(self, environ, start_response):
+        method = environ['REQUEST_METHOD']
+        if method not in ('GET', 'HEAD'):
+            start_response('405 Method Not Allowed', [
+                ('Allow', 'GET, HEAD'), ('Content-Length', '0'),
+            ])
+            return []
+        encoding = self.choose(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        path, size = self.variants[encoding]
+        etag = f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+        headers = self.headers + [('ETag', etag)]
+        if self.not_modified(environ, etag):
+            start_response('304 Not Modified', headers)
+            return []
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        headers.append(('Content-Length', str(size)))
+        start_response('200 OK', headers)
+        if method == 'HEAD':
+            return []
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(open(path, 'rb'), BLOCK_SIZE)
+
+
+def manifest_names(storage):
+    """Имена файлов с хешем из staticfiles.json."""
+    try:
+        return set(storage.load_manifest().values())
+    except ValueError:
+        return set()
+
+
+def scan(root, storage):
+    """{имя относительно root: StaticFile} для всех собранных файлов."""
+    hashed = manifest_names(storage)
+    files = {}
+    suffixes = tuple(extension for _, extension in ENCODINGS)
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.endswith(suffixes):
+                continue
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            files[relative] = StaticFile(path, relative in hashed)
+    return files
+
+
+class StaticFilesMiddleware:
+    """WSGI-обёртка, отдающая файлы из STATIC_ROOT по STATIC_URL.
+
+    Список файлов читается один раз при запуске: отдаются только
+    собранные collectstatic файлы, остальные запросы идут в приложение.
+    """
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        root = root or settings.STATIC_ROOT
+        self.prefix = prefix or settings.STATIC_URL
+        self.files = {}
+        if root and os.path.isdir(root):
+            storage = CompressedManifestStaticFilesStorage(location=root)
+            self.files = scan(root, storage)
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(self.prefix):
+            static_file = self.files.get(path[len(self.prefix):])
+            if static_file is not None:
+                return static_file.respond(environ, start_response)
+        return self.application(environ, start_response)
@@ -0,0 +1,11 @@
+from django import template
+
+from core import holes
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, *args):
+    """Персональный кусок страницы, см. core.holes."""
+    return holes.hole(context['request'], name, *args)
@@ -0,0 +1,140 @@
+"""Помощники тестов, которые проверяют запросы страниц к базе."""
+import traceback
+from contextlib import ContextDecorator
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def plan_problems(sql):
+    """Строки EXPLAIN QUERY PLAN с полным просмотром или сортировкой.
+
+    ``SCAN`` без индекса читает всю таблицу, ``USE TEMP B-TREE`` —
+    сортировка или группировка без подходящего индекса. Просмотр по
+    индексу (``SCAN ... USING INDEX``) допустим: с LIMIT он
+    останавливается на первых строках. Просмотр подзапроса читает уже
+    отобранные им строки.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        details = [row[-1] for row in cursor.fetchall()]
+    return [
+        detail for detail in details
+        if detail.startswith('USE TEMP B-TREE')
+        or detail.startswith('SCAN ')
+        and ' USING ' not in detail
+        and ' VIRTUAL TABLE ' not in detail
+        and detail != 'SCAN CONSTANT ROW'
+        and not detail.startswith(('SCAN subquery', 'SCAN (subquery'))
+    ]
+
+
+class QueryPlanMixin:
+    """Проверка планов всех SELECT, выполненных при запросе страницы.
+
+    ``allowed_plans`` — пары (фрагмент SQL, строка плана), которые
+    допустимы в запросах с этим фрагментом.
+    """
+
+    allowed_plans = ()
+
+    def is_allowed(self, sql, problem):
+        return any(fragment in sql and problem == detail
+                   for fragment, detail in self.allowed_plans)
+
+    def assertQueryPlansUseIndexes(self, url, client=None):
+        client = client or self.client
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertLess(response.status_code, 400, url)
+        failures = []
+        for query in context.captured_queries:
+            sql = query['sql']
+            if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+                continue
+            problems = [problem for problem in plan_problems(sql)
+                        if not self.is_allowed(sql, problem)]
+            if problems:
+                failures.append(f'{sql}\n    ' + '\n    '.join(problems))
+        if failures:
+            self.fail(f'{url}: запросы без индекса:\n' + '\n'.join(failures))
+
+
+def project_frames(stack):
+    """Кадры стека из кода проекта, без Django и прочих библиотек."""
+    frames = [frame for frame in stack
+              if frame.filename.startswith(settings.BASE_DIR)
+              and 'site-packages' not in frame.filename
+              and frame.filename != __file__]
+    return frames or stack
+
+
+class query_budget(ContextDecorator):
+    """Не больше ``limit`` запросов к базе внутри блока или функции.
+
+    Запросы перехватываются через ``connection.execute_wrapper`` вместе
+    со стеком вызова. При превышении тест падает, и для каждого запроса
+    сверх бюджета выводятся его SQL и стек кода проекта, который его
+    выполнил::
+
+        with query_budget(5, 'главная'):
+            self.client.get('/')
+    """
+
+    def __init__(self, limit, label=''):
+        self.limit = limit
+        self.label = label
+        self.queries = []
+
+    def record(self, execute, sql, params, many, context):
+        self.queries.append((sql, params, traceback.extract_stack()[:-1]))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self.queries = []
+        self.wrapper = connection.execute_wrapper(self.record)
+        self.wrapper.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.wrapper.__exit__(exc_type, exc_value, tb)
+        if exc_type is None and len(self.queries) > self.limit:
+            raise AssertionError(self.report())
+
+    def report(self):
+        lines = [f'{self.label}: {len(self.queries)} запросов при '
+                 f'бюджете {self.limit}. Запросы сверх бюджета:']
+        for number, (sql, params, stack) in enumerate(
+            self.queries[self.limit:], self.limit + 1
+        ):
+            lines.append(f'\n#{number} {sql} {params!r}')
+            lines.extend(
+                line.rstrip('\n')
+                for line in traceback.format_list(project_frames(stack))
+            )
+        return '\n'.join(lines)
+
+
+def url_names(urlconf):
+    """Имена всех URL модуля urls вместе с пространством имён."""
+    module = import_module(urlconf)
+    return {f'{module.app_name}:{pattern.name}'
+            for pattern in module.urlpatterns if pattern.name}
+
+
+class QueryBudgetMixin:
+    def assertWithinBudget(self, url, limit, client=None):
+        """GET ``url`` укладывается в ``limit`` запросов.
+
+        Потоковый ответ читается внутри бюджета: его запросы идут при
+        отдаче содержимого.
+        """
+        client = client or self.client
+        with query_budget(limit, url):
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, url)
+        return response
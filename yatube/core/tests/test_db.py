@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+
+from django.db import OperationalError, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from yatube import settings_production
+from ..db import REPLICA, ReplicaRouter
+
+
+@override_settings(SQLITE_PRAGMAS=settings_production.SQLITE_PRAGMAS)
+class SqlitePragmaTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'db.sqlite3')
+
+    def open(self, alias, name=None):
+        wrapper = DatabaseWrapper(
+            {**connections['default'].settings_dict,
+             'NAME': name or self.path},
+            alias=alias,
+        )
+        self.addCleanup(wrapper.close)
+        return wrapper.cursor()
+
+    def pragma(self, cursor, name):
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+    def test_primary_connection(self):
+        cursor = self.open('default')
+        self.assertEqual(self.pragma(cursor, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(cursor, 'synchronous'), 1)
+        self.assertEqual(self.pragma(cursor, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(cursor, 'cache_size'), -64 * 1024)
+
+    def test_base_settings_keep_sqlite_defaults(self):
+        with self.settings(SQLITE_PRAGMAS={}):
+            cursor = self.open('default')
+            self.assertEqual(self.pragma(cursor, 'journal_mode'), 'delete')
+            self.assertEqual(self.pragma(cursor, 'synchronous'), 2)
+
+    def test_replica_connection_only_reads(self):
+        self.open('default').execute('CREATE TABLE note (text TEXT)')
+        cursor = self.open(REPLICA, f'file:{self.path}?mode=ro')
+        self.assertEqual(self.pragma(cursor, 'journal_mode'), 'wal')
+        cursor.execute('SELECT count(*) FROM note')
+        with self.assertRaises(OperationalError):
+            cursor.execute("INSERT INTO note VALUES ('x')")
+
+
+class ReplicaRouterTests(TestCase):
+    def test_without_replica_alias_everything_uses_default(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(None))
+        self.assertEqual(router.db_for_write(None), 'default')
+        self.assertFalse(router.allow_migrate(REPLICA, 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
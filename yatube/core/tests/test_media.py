@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from ..media import RangeFile, parse_range
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+DATA = bytes(range(256)) * 40
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaServeTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts', 'big.jpg'),
+                  'wb') as media_file:
+            media_file.write(DATA)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    url = '/media/posts/big.jpg'
+
+    def body(self, response):
+        content = b''.join(response.streaming_content)
+        response.close()
+        return content
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(DATA)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(self.body(response), DATA)
+
+    def test_ranges(self):
+        cases = {
+            'bytes=0-99': (0, 99),
+            'bytes=10000-': (10000, len(DATA) - 1),
+            'bytes=-24': (len(DATA) - 24, len(DATA) - 1),
+            'bytes=10230-99999': (10230, len(DATA) - 1),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(header=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'],
+                                 f'bytes {start}-{end}/{len(DATA)}')
+                self.assertEqual(response['Content-Length'],
+                                 str(end - start + 1))
+                self.assertEqual(self.body(response), DATA[start:end + 1])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=20000-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(DATA)}')
+
+    def test_if_range_mismatch_sends_whole_file(self):
+        response = self.client.get(
+            self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), DATA)
+
+    def test_conditional_get(self):
+        response = self.client.get(self.url)
+        response.close()
+        for header, value in (('HTTP_IF_NONE_MATCH', response['ETag']),
+                              ('HTTP_IF_MODIFIED_SINCE',
+                               response['Last-Modified'])):
+            with self.subTest(header=header):
+                response = self.client.get(self.url, **{header: value})
+                self.assertEqual(response.status_code, 304)
+
+    def test_missing_and_outside_files(self):
+        for url in ('/media/posts/nope.jpg', '/media/posts',
+                    '/media/../manage.py', '/media/posts/big.jpg/x'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_only_safe_methods(self):
+        self.assertEqual(self.client.post(self.url).status_code, 405)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect',
+                       MEDIA_ACCEL_REDIRECT_PREFIX='/protected/')
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected/posts/big.jpg')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'big.jpg'),
+        )
+        self.assertEqual(response.content, b'')
+
+
+class RangeTests(SimpleTestCase):
+    def test_parse_range(self):
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range('items=0-1', 100))
+        self.assertIsNone(parse_range('bytes=5-1', 100))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+        with self.assertRaises(ValueError):
+            parse_range('bytes=-0', 100)
+
+    def test_range_file_stops_at_length(self):
+        with tempfile.TemporaryFile() as source:
+            source.write(DATA)
+            part = RangeFile(source, 5, 3)
+            self.assertEqual(part.read(100), DATA[5:8])
+            self.assertEqual(part.read(100), b'')
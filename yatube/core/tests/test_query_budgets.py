@@ -0,0 +1,135 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.counters import recount_user
+from posts.models import Comment, Follow, Group, Post
+
+from ..testing import QueryBudgetMixin, query_budget, url_names
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+# Сколько запросов может сделать страница с холодным кешем: аноним и
+# вошедший пользователь. Число не должно расти с числом постов на
+# странице, комментариев или подписок.
+BUDGETS = {
+    'posts:home': (2, 4),
+    'posts:group_list': (4, 6),
+    'posts:profile': (4, 7),
+    'posts:post_detail': (3, 5),
+    'posts:create_post': (0, 3),
+    'posts:post_edit': (0, 3),
+    'posts:add_comment': (0, 3),
+    'posts:follow_index': (0, 4),
+    'posts:search': (3, 5),
+    'posts:export': (0, 3),
+    'posts:profile_follow': (0, 10),
+    'posts:profile_unfollow': (0, 7),
+    'users:signup': (0, 2),
+    'users:login': (0, 2),
+    'users:logout': (0, 4),
+    'about:author': (0, 0),
+    'about:tech': (0, 0),
+}
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(5)]
+        cls.reader = User.objects.create_user(username='reader',
+                                              is_staff=True)
+        cls.groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'group{i}',
+                                 description='Описание')
+            for i in range(3)
+        ]
+        cls.posts = [
+            Post.objects.create(
+                author=cls.authors[i % 5], text=f'Пост номер {i}',
+                group=cls.groups[i % 3] if i % 4 else None,
+                image=(SimpleUploadedFile(f'{i}.gif', SMALL_GIF)
+                       if i % 7 == 0 else None),
+            )
+            for i in range(40)
+        ]
+        cls.post = cls.posts[-1]
+        for i in range(20):
+            Comment.objects.create(post=cls.post,
+                                   author=cls.authors[i % 5],
+                                   text=f'Комментарий {i}')
+        for author in cls.authors[:3]:
+            Follow.objects.create(user=cls.reader, author=author)
+        # Строки счётчиков создаются при первом обращении; бюджет
+        # считается для уже заведённых.
+        for user in cls.authors + [cls.reader]:
+            recount_user(user.pk)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def url(self, name):
+        kwargs = {
+            'posts:group_list': {'slug': 'group1'},
+            'posts:profile': {'username': 'author0'},
+            'posts:post_detail': {'post_id': self.post.pk},
+            'posts:post_edit': {'post_id': self.post.pk},
+            'posts:add_comment': {'post_id': self.post.pk},
+            'posts:export': {'kind': 'post'},
+            'posts:profile_follow': {'username': 'author4'},
+            'posts:profile_unfollow': {'username': 'author0'},
+        }.get(name, {})
+        url = reverse(name, kwargs=kwargs)
+        if name == 'posts:search':
+            url += '?q=номер'
+        return url
+
+    def test_every_url_has_budget(self):
+        names = set().union(*map(url_names, (
+            'posts.urls', 'users.urls', 'about.urls'
+        )))
+        self.assertEqual(names, set(BUDGETS))
+
+    def test_pages_fit_budgets(self):
+        for name, (anonymous, user) in BUDGETS.items():
+            for client, limit in ((self.client, anonymous),
+                                  (self.reader_client, user)):
+                with self.subTest(name=name, user=client is not self.client):
+                    cache.clear()
+                    self.assertWithinBudget(self.url(name), limit, client)
+
+    def test_report_shows_sql_and_stack(self):
+        with self.assertRaises(AssertionError) as context:
+            with query_budget(1, 'проверка'):
+                list(Group.objects.all())
+                list(Post.objects.all())
+        report = str(context.exception)
+        self.assertIn('2 запросов при бюджете 1', report)
+        self.assertIn('#2 SELECT', report)
+        self.assertIn('test_report_shows_sql_and_stack', report)
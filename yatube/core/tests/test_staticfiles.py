@@ -0,0 +1,130 @@
+import gzip
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.templatetags.static import static
+
+from ..staticfiles import StaticFilesMiddleware, accepted_encodings
+
+TEMP_STATIC_ROOT = tempfile.mkdtemp()
+
+
+def fallback_app(environ, start_response):
+    start_response('404 Not Found', [('Content-Type', 'text/plain')])
+    return [b'app']
+
+
+@override_settings(STATIC_ROOT=TEMP_STATIC_ROOT)
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.server = StaticFilesMiddleware(fallback_app)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def request(self, path, method='GET', **headers):
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'wsgi.input': BytesIO(),
+        }
+        environ.update(headers)
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+
+        body = b''.join(self.server(environ, start_response))
+        return response['status'], response['headers'], body
+
+    def test_hashed_file_is_immutable(self):
+        url = static('css/styles.css')
+        self.assertRegex(url, r'^/static/css/styles\.[0-9a-f]{12}\.css$')
+        status, headers, body = self.request(url)
+        self.assertEqual(status, '200 OK')
+        self.assertIn('immutable', headers['Cache-Control'])
+        self.assertEqual(headers['Content-Type'], 'text/css; charset=utf-8')
+        self.assertEqual(int(headers['Content-Length']), len(body))
+
+    def test_unhashed_file_is_short_lived(self):
+        status, headers, _ = self.request('/static/css/styles.css')
+        self.assertEqual(status, '200 OK')
+        self.assertNotIn('immutable', headers['Cache-Control'])
+
+    def test_precompressed_variant_by_accept_encoding(self):
+        url = static('css/bootstrap.min.css')
+        _, plain_headers, plain = self.request(url)
+        status, headers, body = self.request(
+            url, HTTP_ACCEPT_ENCODING='deflate, gzip;q=0.8'
+        )
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+        self.assertLess(len(body), len(plain))
+        self.assertEqual(gzip.decompress(body), plain)
+        self.assertNotEqual(headers['ETag'], plain_headers['ETag'])
+        _, headers, _ = self.request(
+            url, HTTP_ACCEPT_ENCODING='gzip;q=0'
+        )
+        self.assertNotIn('Content-Encoding', headers)
+
+    def test_images_are_not_compressed(self):
+        _, headers, _ = self.request(
+            static('img/logo.png'), HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(headers['Content-Type'], 'image/png')
+
+    def test_conditional_requests(self):
+        url = static('css/styles.css')
+        _, headers, _ = self.request(url)
+        status, _, body = self.request(
+            url, HTTP_IF_NONE_MATCH=headers['ETag']
+        )
+        self.assertEqual((status, body), ('304 Not Modified', b''))
+        status, _, _ = self.request(
+            url, HTTP_IF_MODIFIED_SINCE=headers['Last-Modified']
+        )
+        self.assertEqual(status, '304 Not Modified')
+
+    def test_head_and_other_methods(self):
+        url = static('css/styles.css')
+        status, headers, body = self.request(url, method='HEAD')
+        self.assertEqual((status, body), ('200 OK', b''))
+        self.assertNotEqual(headers['Content-Length'], '0')
+        status, _, _ = self.request(url, method='POST')
+        self.assertEqual(status, '405 Method Not Allowed')
+
+    def test_unknown_files_go_to_application(self):
+        for path in ('/static/css/missing.css', '/static/../manage.py',
+                     '/posts/1/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.request(path)[2], b'app')
+
+    def test_file_wrapper_is_used(self):
+        wrapped = []
+
+        def file_wrapper(file, block_size):
+            wrapped.append(file)
+            return iter(lambda: file.read(block_size), b'')
+
+        self.request(static('css/styles.css'),
+                     **{'wsgi.file_wrapper': file_wrapper})
+        self.assertEqual(len(wrapped), 1)
+        wrapped[0].close()
+
+
+class AcceptEncodingTests(SimpleTestCase):
+    def test_parse(self):
+        self.assertEqual(accepted_encodings('gzip, deflate, br'),
+                         {'gzip', 'deflate', 'br'})
+        self.assertEqual(accepted_encodings('br;q=0, GZIP;q=0.5'), {'gzip'})
+        self.assertEqual(accepted_encodings(''), set())
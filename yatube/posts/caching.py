@@ -0,0 +1,119 @@
+"""Кеширование страниц с инвалидацией по поколениям.
+
+Ключ закешированной страницы включает номера поколений её областей
+(``posts``, ``post:<id>``, ...). Сигналы записи увеличивают номер
+поколения, и следующий запрос просто не находит старую страницу, поэтому
+страницы можно хранить часами без риска показать устаревшие данные.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core import holes
+
+
+def generation_key(scope):
+    return f'posts:generation:{scope}'
+
+
+def new_generation():
+    # Поколение, вытесненное из кеша, не должно начаться заново с
+    # номера, под которым уже лежат старые страницы.
+    return time.time_ns()
+
+
+def get_generations(scopes):
+    keys = [generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, new_generation(), timeout=None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump_generation(*scopes):
+    """Делает устаревшими все страницы, зависящие от ``scopes``."""
+    for scope in scopes:
+        try:
+            cache.incr(generation_key(scope))
+        except ValueError:
+            cache.set(generation_key(scope), new_generation(), timeout=None)
+
+
+def scope_names(scopes, kwargs):
+    """Имена областей: функции вызываются с именованными аргументами view."""
+    return [
+        scope(**kwargs) if callable(scope) else scope for scope in scopes
+    ]
+
+
+def page_key(view_name, generations, path):
+    digest = hashlib.md5(path.encode()).hexdigest()
+    return f'posts:page:{view_name}:{generations}:{digest}'
+
+
+def render_shared(view, request, *args, **kwargs):
+    """Рендерит страницу для общего кеша.
+
+    Всё, что не вынесено в дырки, рендерится для анонимного зрителя:
+    ``user`` в шаблоне вне дырки не попадёт в чужой ответ. Второй
+    результат — нужен ли был при рендере CSRF-токен; такая страница
+    персональна и в кеш не кладётся.
+    """
+    user = request.user
+    csrf_used = request.META.pop('CSRF_COOKIE_USED', False)
+    request.user = AnonymousUser()
+    try:
+        with holes.deferred(request):
+            response = view(request, *args, **kwargs)
+    finally:
+        request.user = user
+        personal = request.META.get('CSRF_COOKIE_USED', False)
+        if csrf_used:
+            request.META['CSRF_COOKIE_USED'] = True
+    return response, personal
+
+
+def cache_page_by_generation(timeout, *scopes):
+    """Кеширует страницу, пока не сменились поколения её областей.
+
+    Область — строка или функция от именованных аргументов view,
+    например ``lambda post_id: f'post:{post_id}'``. Страница хранится
+    одна для всех зрителей: персональные куски в ней — дырки
+    (core.holes), которые заполняются при каждом ответе. Остальное
+    рендерится как для анонима (см. ``render_shared``).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            generations = '.'.join(
+                map(str, get_generations(scope_names(scopes, kwargs)))
+            )
+            key = page_key(
+                view.__name__, generations, request.get_full_path()
+            )
+            page = cache.get(key)
+            if page is not None:
+                content, content_type = page
+                return HttpResponse(
+                    holes.fill(request, content), content_type=content_type
+                )
+            response, personal = render_shared(
+                view, request, *args, **kwargs
+            )
+            if response.streaming:
+                return response
+            content = response.content.decode(response.charset)
+            if response.status_code == 200 and not personal:
+                cache.set(key, (content, response['Content-Type']), timeout)
+            response.content = holes.fill(request, content)
+            return response
+        return wrapper
+    return decorator
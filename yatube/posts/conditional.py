@@ -0,0 +1,98 @@
+"""Условные GET-запросы (ETag) для страниц постов.
+
+До вызова view одним индексным запросом находится дата свежайшего поста
+или комментария страницы, а ETag собирается из неё, поколений областей
+страницы (см. posts.caching) и id пользователя: шапка, ссылки на
+редактирование и кнопка подписки зависят от того, кто смотрит. Если
+клиент прислал совпадающий If-None-Match, ответ 304 отдаётся без
+обращения к кешу страниц и без шаблонов.
+
+Last-Modified не отправляется и If-Modified-Since не проверяется: дата
+не меняется при правке текста, смене подписок или зрителя, а после
+удаления свежайшего поста уходит назад, и клиент получал бы 304 на
+устаревшую страницу.
+"""
+import hashlib
+from functools import wraps
+
+from django.db.models import OuterRef, Subquery
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .caching import get_generations, scope_names
+from .models import Comment, Group, Post, User
+
+MISSING = object()
+
+
+def latest(queryset, field):
+    """Подзапрос: самое позднее значение ``field`` в ``queryset``."""
+    return Subquery(queryset.order_by(f'-{field}').values(field)[:1])
+
+
+def newest(*dates):
+    return max((date for date in dates if date is not None), default=None)
+
+
+def group_modified(slug):
+    row = Group.objects.filter(slug=slug).values(
+        latest=latest(Post.objects.filter(group=OuterRef('pk')), 'pub_date')
+    ).first()
+    return MISSING if row is None else row['latest']
+
+
+def profile_modified(username):
+    row = User.objects.filter(username=username).values(
+        latest=latest(Post.objects.filter(author=OuterRef('pk')), 'pub_date')
+    ).first()
+    return MISSING if row is None else row['latest']
+
+
+def post_modified(post_id):
+    row = Post.objects.filter(pk=post_id).values(
+        'pub_date',
+        latest_comment=latest(
+            Comment.objects.filter(post=OuterRef('pk')), 'created'
+        ),
+    ).first()
+    if row is None:
+        return MISSING
+    return newest(row['pub_date'], row['latest_comment'])
+
+
+def page_etag(view_name, generations, user_id, last_modified):
+    version = f'{view_name}:{generations}:{user_id}:{last_modified}'
+    return hashlib.md5(version.encode()).hexdigest()
+
+
+def conditional_page(modified, *scopes):
+    """Отвечает 304 Not Modified, пока страница не изменилась.
+
+    ``modified`` получает именованные аргументы view и возвращает дату
+    последнего изменения для ETag (None, если её нет) или MISSING, если
+    объекта нет, — тогда view отвечает сама, обычно 404. Области — как у
+    ``cache_page_by_generation``. Страница помечается ``no-cache``:
+    браузер хранит её, но перед показом перепроверяет.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            last_modified = modified(**kwargs)
+            if last_modified is MISSING:
+                return view(request, *args, **kwargs)
+            etag = page_etag(
+                view.__name__,
+                get_generations(scope_names(scopes, kwargs)),
+                request.user.pk,
+                last_modified,
+            )
+            response = condition(etag_func=lambda *_, **__: etag)(view)(
+                request, *args, **kwargs
+            )
+            patch_cache_control(response, no_cache=True, max_age=0)
+            del response['Expires']
+            return response
+        return wrapper
+    return decorator
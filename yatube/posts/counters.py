@@ -0,0 +1,78 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарным ``UPDATE ... SET n = n + 1`` в сигналах,
+поэтому профиль и страница поста не выполняют ``COUNT(*)``. Строка
+``UserCounters`` создаётся лениво с точными значениями при первом чтении;
+расхождения находит и исправляет команда ``repair_counters``.
+"""
+from django.db.models import (Case, Count, F, IntegerField, OuterRef,
+                              Subquery, When)
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserCounters
+
+
+def change_user_counters(user_id, **deltas):
+    UserCounters.objects.filter(user_id=user_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def change_follow_counters(user_id, author_id, delta):
+    """Подписки ``user_id`` и подписчики ``author_id`` одним UPDATE."""
+    def share(field, owner_id):
+        return F(field) + Case(When(user_id=owner_id, then=delta),
+                               default=0, output_field=IntegerField())
+
+    UserCounters.objects.filter(user_id__in=[user_id, author_id]).update(
+        following_count=share('following_count', user_id),
+        followers_count=share('followers_count', author_id),
+    )
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def _count(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def actual_user_counters():
+    """Пользователи с точными значениями счётчиков, посчитанными в БД."""
+    return User.objects.annotate(
+        actual_posts=_count(Post, 'author'),
+        actual_followers=_count(Follow, 'author'),
+        actual_following=_count(Follow, 'user'),
+    )
+
+
+def actual_comment_counts():
+    return Post.objects.annotate(actual_comments=_count(Comment, 'post'))
+
+
+def recount_user(user_id):
+    user = actual_user_counters().get(pk=user_id)
+    counters, _ = UserCounters.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            'posts_count': user.actual_posts,
+            'followers_count': user.actual_followers,
+            'following_count': user.actual_following,
+        },
+    )
+    return counters
+
+
+def get_counters(user):
+    """Счётчики пользователя; отсутствующая строка создаётся по факту."""
+    try:
+        return user.counters
+    except UserCounters.DoesNotExist:
+        return recount_user(user.pk)
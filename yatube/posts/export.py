@@ -0,0 +1,134 @@
+"""Потоковая выгрузка постов и комментариев в CSV или JSONL.
+
+Строки читаются keyset-кусками по id (``WHERE id > последний ORDER BY id
+LIMIT chunk_size``) и сериализуются лениво, поэтому выгрузка всей таблицы
+занимает постоянную память. JSONL совпадает с форматом, который читает
+команда import_content.
+"""
+import csv
+import json
+import zlib
+
+from .models import Comment, Post
+
+CHUNK_SIZE = 2000
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {'jsonl': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Имя колонки в выгрузке → поле выборки.
+EXPORTS = {
+    'post': (Post, {
+        'id': 'pk',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'comments_count': 'comments_count',
+    }),
+    'comment': (Comment, {
+        'id': 'pk',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+}
+
+
+def export_queryset(kind, author=None, group=None):
+    model, _ = EXPORTS[kind]
+    queryset = model.objects.all()
+    if author:
+        queryset = queryset.filter(author__username=author)
+    if group:
+        lookup = 'group__slug' if model is Post else 'post__group__slug'
+        queryset = queryset.filter(**{lookup: group})
+    return queryset
+
+
+def iter_rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    """Кортежи ``fields`` по возрастанию id, по chunk_size за запрос."""
+    last = 0
+    while True:
+        rows = list(
+            queryset.filter(pk__gt=last).order_by('pk')
+            .values_list(*fields)[:chunk_size]
+        )
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][0]
+
+
+def serialize(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def jsonl_lines(kind, columns, rows):
+    for row in rows:
+        record = {'type': kind}
+        record.update(zip(columns, map(serialize, row)))
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def csv_lines(columns, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([serialize(value) for value in row])
+
+
+def gzip_chunks(chunks, level=6):
+    """Сжимает поток байтов в формат gzip на лету."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def buffered(lines, size=64 * 1024):
+    """Склеивает строки в куски байтов примерно по ``size``."""
+    buffer, length = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def export_chunks(kind, fmt='jsonl', compress=False, author=None,
+                  group=None, chunk_size=CHUNK_SIZE):
+    """Куски байтов выгрузки для StreamingHttpResponse или файла."""
+    _, fields = EXPORTS[kind]
+    columns = list(fields)
+    rows = iter_rows(
+        export_queryset(kind, author, group), list(fields.values()),
+        chunk_size,
+    )
+    if fmt == 'csv':
+        lines = csv_lines(columns, rows)
+    else:
+        lines = jsonl_lines(kind, columns, rows)
+    chunks = buffered(lines)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+def export_filename(kind, fmt, compress=False):
+    return f'{kind}s.{fmt}' + ('.gz' if compress else '')
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 from .models import Post, Comment
+from .uploads import process_image
 
 
 class PostForm(forms.ModelForm):
@@ -15,6 +17,12 @@ class PostForm(forms.ModelForm):
             'group': 'Группа',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return process_image(image)
+        return image
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
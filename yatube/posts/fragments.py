@@ -0,0 +1,83 @@
+"""Кеш отрендеренных карточек постов (posts/includes/publication.html).
+
+Карточка одна для всех зрителей и всех лент, ключ собирается из id поста
+и поколений ``publication:post:<id>``, ``publication:user:<id>`` и
+``publication:group:<id>``, которые сигналы увеличивают при изменении
+поста, автора или группы. Ссылку «редактировать» видит только автор,
+поэтому в закешированной карточке на её месте стоит метка EDIT_LINK,
+которую ``publication_html`` заменяет дыркой ``edit_link``
+(см. core.holes).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import holes
+
+from .caching import get_generations
+from .thumbnails import prefetch_post_images
+
+TEMPLATE = 'posts/includes/publication.html'
+EDIT_LINK = '<!--edit-link-->'
+
+
+def publication_scopes(post):
+    scopes = [f'publication:post:{post.pk}',
+              f'publication:user:{post.author_id}']
+    if post.group_id is not None:
+        scopes.append(f'publication:group:{post.group_id}')
+    return scopes
+
+
+def publication_key(post, generations, show_group):
+    # Заглушка вместо картинки сменится на <picture>, когда варианты
+    # будут готовы, поэтому их наличие тоже входит в ключ.
+    return 'publication:{}:{}:{}:{}:{}'.format(
+        post.pk, post.group_id, '.'.join(map(str, generations)),
+        int(show_group), int(bool(post.prefetched_image)),
+    )
+
+
+def prefetch_publications(posts, show_group):
+    """Разом находит закешированные карточки постов страницы.
+
+    Два обращения к кешу на страницу: за поколениями и за карточками.
+    Ключ и найденная карточка (или None) кладутся в
+    ``post.publication``.
+    """
+    posts = list(posts)
+    prefetch_post_images(posts)
+    scopes = [publication_scopes(post) for post in posts]
+    unique = list(dict.fromkeys(scope for names in scopes for scope in names))
+    by_scope = dict(zip(unique, get_generations(unique)))
+    keys = [
+        publication_key(post, [by_scope[scope] for scope in names],
+                        show_group)
+        for post, names in zip(posts, scopes)
+    ]
+    found = cache.get_many(keys)
+    for post, key in zip(posts, keys):
+        post.publication = key, found.get(key)
+
+
+def render_publication(post, show_group):
+    try:
+        key, html = post.publication
+    except AttributeError:
+        prefetch_publications([post], show_group)
+        key, html = post.publication
+    if html is None:
+        html = render_to_string(
+            TEMPLATE, {'post': post, 'show_group': show_group}
+        )
+        cache.set(key, html, settings.CACHE_TIME)
+    return html
+
+
+def publication_html(post, request, show_group=True):
+    """Карточка поста с персональной ссылкой «редактировать»."""
+    edit_link = holes.hole(request, 'edit_link', post.pk, post.author_id)
+    return mark_safe(
+        render_publication(post, show_group).replace(EDIT_LINK, edit_link)
+    )
@@ -0,0 +1,62 @@
+"""Персональные куски страниц постов (см. core.holes)."""
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.html import format_html
+
+from core.holes import register
+
+from .forms import CommentForm
+from .models import Follow
+
+
+def is_author(request, author_id):
+    return (request.user.is_authenticated
+            and str(request.user.pk) == str(author_id))
+
+
+@register('edit_link')
+def edit_link(request, post_id, author_id):
+    if not is_author(request, author_id):
+        return ''
+    return format_html(
+        '<p>\n    <a href="{}">редактировать запись</a>\n  </p>',
+        reverse('posts:post_edit', args=[post_id]),
+    )
+
+
+@register('edit_button')
+def edit_button(request, post_id, author_id):
+    if not is_author(request, author_id):
+        return ''
+    return format_html(
+        '<a class="btn btn-primary" href="{}">\n'
+        '        Редактировать запись\n      </a>',
+        reverse('posts:post_edit', args=[post_id]),
+    )
+
+
+@register('switcher')
+def switcher(request):
+    return render_to_string(
+        'posts/includes/switcher.html', request=request
+    )
+
+
+@register('comment_form')
+def comment_form(request, post_id):
+    return render_to_string(
+        'posts/includes/comment_form.html',
+        {'post_id': post_id, 'form': CommentForm()},
+        request=request,
+    )
+
+
+@register('follow_button')
+def follow_button(request, username):
+    following = request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author__username=username
+    ).exists()
+    return render_to_string(
+        'posts/includes/follow_button.html',
+        {'username': username, 'following': following},
+    )
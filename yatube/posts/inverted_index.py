@@ -0,0 +1,366 @@
+"""Инвертированный индекс постов для поиска без FTS5.
+
+Индекс живёт в двух файлах рядом с SEARCH_INDEX_PATH:
+
+* сегмент — неизменяемый файл, который каждый процесс открывает через
+  mmap, так что страницы файла делятся между воркерами через page cache
+  ОС и не копируются в память каждого процесса;
+* журнал ``<сегмент>.<поколение>.journal`` — строки JSON с новыми
+  версиями постов, которые дописывают сигналы сохранения и удаления.
+
+При каждом запросе процесс дочитывает журнал с места, где остановился.
+Посты из журнала перекрывают свои старые версии в сегменте. Когда журнал
+вырастает больше SEARCH_INDEX_JOURNAL_LIMIT байт, сегмент пересобирается
+со следующим поколением, а журнал начинается заново.
+
+Формат сегмента (little-endian): заголовок HEADER, отсортированный массив
+uint32 id постов, массив записей TERM по алфавиту основ, строки основ
+и списки вхождений. Список вхождений основы — пары
+(разность id с предыдущим, число вхождений) в varint.
+"""
+import fcntl
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .stemmer import stem, tokenize
+
+MAGIC = b'YPIX'
+VERSION = 1
+HEADER = struct.Struct('<4sIQIIQQQQ')
+TERM = struct.Struct('<IIQII')
+MAX_TERMS = 10
+OPERATORS = {'OR': 'or', 'ИЛИ': 'or', 'AND': 'and', 'И': 'and'}
+QUERY_RE = re.compile(r'\w+\*?')
+
+
+def encode_postings(postings):
+    """Упаковывает отсортированные пары (id, tf) в varint-разности."""
+    result = bytearray()
+    previous = 0
+    for doc_id, tf in postings:
+        for value in (doc_id - previous, tf):
+            while value >= 0x80:
+                result.append(value & 0x7F | 0x80)
+                value >>= 7
+            result.append(value)
+        previous = doc_id
+    return bytes(result)
+
+
+def decode_postings(data):
+    """Обратное к encode_postings: пары (id, tf) по возрастанию id."""
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value = shift = 0
+    doc_id = 0
+    postings = []
+    for i in range(0, len(values), 2):
+        doc_id += values[i]
+        postings.append((doc_id, values[i + 1]))
+    return postings
+
+
+def parse_query(query):
+    """Группы OR из групп AND: [[(основа, префикс?), ...], ...].
+
+    Слова через пробел должны встретиться все; OR (или ИЛИ) разделяет
+    альтернативы, ``слово*`` ищет все основы с таким началом.
+    """
+    groups = [[]]
+    terms = 0
+    for token in QUERY_RE.findall(query):
+        operator = OPERATORS.get(token)
+        if operator == 'or':
+            if groups[-1]:
+                groups.append([])
+            continue
+        if operator == 'and' or terms == MAX_TERMS:
+            continue
+        word = token.rstrip('*').lower()
+        groups[-1].append((stem(word), token.endswith('*')))
+        terms += 1
+    return [group for group in groups if group]
+
+
+class Segment:
+    """Сегмент индекса, открытый через mmap."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as segment_file:
+            self.map = mmap.mmap(
+                segment_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        (magic, version, self.generation, self.doc_count, self.term_count,
+         docs_offset, self.terms_offset, self.strings_offset,
+         self.postings_offset) = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path}: не сегмент поискового индекса')
+        self.doc_ids = memoryview(self.map)[
+            docs_offset:docs_offset + 4 * self.doc_count
+        ].cast('I')
+
+    def close(self):
+        self.doc_ids.release()
+        self.map.close()
+
+    def contains(self, doc_id):
+        i = bisect_left(self.doc_ids, doc_id)
+        return i < self.doc_count and self.doc_ids[i] == doc_id
+
+    def term(self, i):
+        offset, length, postings, size, df = TERM.unpack_from(
+            self.map, self.terms_offset + i * TERM.size
+        )
+        start = self.strings_offset + offset
+        return self.map[start:start + length].decode(), postings, size, df
+
+    def find(self, term):
+        """Индекс первой основы не меньше ``term`` (бинарный поиск)."""
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self.term(middle)[0] < term:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def terms(self, term, prefix=False):
+        """(основа, df, вхождения) для основы или всех основ с префиксом."""
+        for i in range(self.find(term), self.term_count):
+            found, offset, size, df = self.term(i)
+            if found != term and not (prefix and found.startswith(term)):
+                return
+            start = self.postings_offset + offset
+            yield found, df, decode_postings(self.map[start:start + size])
+
+    def all_terms(self):
+        for i in range(self.term_count):
+            term, offset, size, _ = self.term(i)
+            start = self.postings_offset + offset
+            yield term, decode_postings(self.map[start:start + size])
+
+
+def write_segment(path, generation, postings):
+    """Атомарно записывает сегмент из {основа: [(id, tf), ...]}."""
+    doc_ids = sorted({doc_id for items in postings.values()
+                      for doc_id, _ in items})
+    terms, strings, blobs = [], bytearray(), bytearray()
+    for term in sorted(postings):
+        encoded_term = term.encode()
+        blob = encode_postings(sorted(postings[term]))
+        terms.append(TERM.pack(len(strings), len(encoded_term), len(blobs),
+                               len(blob), len(postings[term])))
+        strings += encoded_term
+        blobs += blob
+    docs_offset = HEADER.size
+    terms_offset = docs_offset + 4 * len(doc_ids)
+    strings_offset = terms_offset + TERM.size * len(terms)
+    postings_offset = strings_offset + len(strings)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as segment_file:
+        segment_file.write(HEADER.pack(
+            MAGIC, VERSION, generation, len(doc_ids), len(terms),
+            docs_offset, terms_offset, strings_offset, postings_offset,
+        ))
+        segment_file.write(struct.pack(f'<{len(doc_ids)}I', *doc_ids))
+        segment_file.write(b''.join(terms))
+        segment_file.write(strings)
+        segment_file.write(blobs)
+        segment_file.flush()
+        os.fsync(segment_file.fileno())
+    os.replace(temporary, path)
+
+
+class InvertedIndex:
+    """Сегмент и журнал индекса с ранжированием по TF-IDF."""
+
+    def __init__(self, path):
+        self.path = path
+        self.segment = None
+        self.file_id = None
+        self.generation = 0
+        self.overlay = {}
+        self.journal_offset = 0
+        self.lock = threading.Lock()
+
+    def journal_path(self, generation):
+        return f'{self.path}.{generation}.journal'
+
+    @contextmanager
+    def file_lock(self):
+        """Межпроцессная блокировка записи в журнал и пересборки."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f'{self.path}.lock', 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Переоткрывает сменившийся сегмент и дочитывает журнал."""
+        try:
+            stat = os.stat(self.path)
+            file_id = stat.st_ino, stat.st_mtime_ns
+        except FileNotFoundError:
+            file_id = None
+        if file_id != self.file_id:
+            if self.segment is not None:
+                self.segment.close()
+            self.segment = Segment(self.path) if file_id else None
+            self.file_id = file_id
+            self.generation = self.segment.generation if self.segment else 0
+            self.overlay = {}
+            self.journal_offset = 0
+        try:
+            with open(self.journal_path(self.generation), 'rb') as journal:
+                journal.seek(self.journal_offset)
+                data = journal.read()
+        except FileNotFoundError:
+            return
+        # Последняя строка может дописываться прямо сейчас.
+        complete = data[:data.rfind(b'\n') + 1]
+        self.journal_offset += len(complete)
+        for line in complete.splitlines():
+            record = json.loads(line)
+            self.overlay[record['id']] = record['terms']
+
+    def write(self, doc_id, terms):
+        """Дописывает новую версию поста (None — удалён) в журнал."""
+        record = json.dumps({'id': doc_id, 'terms': terms},
+                            ensure_ascii=False)
+        with self.lock, self.file_lock():
+            self.refresh()
+            with open(self.journal_path(self.generation), 'ab') as journal:
+                journal.write(record.encode() + b'\n')
+                size = journal.tell()
+            if size > settings.SEARCH_INDEX_JOURNAL_LIMIT:
+                self.compact()
+
+    def add(self, doc_id, text):
+        self.write(doc_id, dict(Counter(tokenize(text))))
+
+    def remove(self, doc_id):
+        self.write(doc_id, None)
+
+    def compact(self):
+        """Сливает журнал в новый сегмент; вызывается под file_lock."""
+        self.refresh()
+        postings = defaultdict(list)
+        if self.segment is not None:
+            for term, items in self.segment.all_terms():
+                postings[term].extend(
+                    item for item in items if item[0] not in self.overlay
+                )
+        for doc_id, terms in self.overlay.items():
+            for term, tf in (terms or {}).items():
+                postings[term].append((doc_id, tf))
+        self.replace({term: items for term, items in postings.items()
+                      if items})
+
+    def replace(self, postings):
+        old_journal = self.journal_path(self.generation)
+        write_segment(self.path, self.generation + 1, postings)
+        if os.path.exists(old_journal):
+            os.remove(old_journal)
+        self.refresh()
+
+    def rebuild(self, documents):
+        """Строит индекс заново из пар (id, текст)."""
+        postings = defaultdict(list)
+        for doc_id, text in documents:
+            for term, tf in Counter(tokenize(text)).items():
+                postings[term].append((doc_id, tf))
+        with self.lock, self.file_lock():
+            self.refresh()
+            self.replace(postings)
+
+    def doc_count(self):
+        count = self.segment.doc_count if self.segment else 0
+        for doc_id, terms in self.overlay.items():
+            if self.segment is not None and self.segment.contains(doc_id):
+                count -= 1
+            if terms is not None:
+                count += 1
+        return count
+
+    def term_scores(self, term, prefix, doc_count):
+        """{id: TF-IDF} для основы или всех основ с префиксом."""
+        matches = defaultdict(list)
+        if self.segment is not None:
+            for found, _, items in self.segment.terms(term, prefix):
+                matches[found].extend(
+                    item for item in items if item[0] not in self.overlay
+                )
+        for doc_id, terms in self.overlay.items():
+            for found, tf in (terms or {}).items():
+                if found == term or (prefix and found.startswith(term)):
+                    matches[found].append((doc_id, tf))
+        scores = defaultdict(float)
+        for items in matches.values():
+            if not items:
+                continue
+            idf = math.log(1 + doc_count / len(items))
+            for doc_id, tf in items:
+                scores[doc_id] += (1 + math.log(tf)) * idf
+        return scores
+
+    def search(self, query):
+        """Список (id, score) по убыванию TF-IDF."""
+        groups = parse_query(query)
+        with self.lock:
+            self.refresh()
+            doc_count = self.doc_count()
+            scores = defaultdict(float)
+            for group in groups:
+                found = None
+                for term, prefix in group:
+                    term_scores = self.term_scores(term, prefix, doc_count)
+                    if found is None:
+                        found = term_scores
+                    else:
+                        found = {doc_id: score + term_scores[doc_id]
+                                 for doc_id, score in found.items()
+                                 if doc_id in term_scores}
+                for doc_id, score in found.items():
+                    scores[doc_id] += score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index():
+    """Индекс этого процесса для SEARCH_INDEX_PATH."""
+    path = settings.SEARCH_INDEX_PATH
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = InvertedIndex(path)
+        return _indexes[path]
+
+
+def search_post_ids(query, position=None, limit=None):
+    """Как search.search_post_ids: (id, score), меньший score лучше."""
+    rows = [(doc_id, -score) for doc_id, score in get_index().search(query)]
+    if position is not None:
+        rows = [(doc_id, score) for doc_id, score in rows
+                if (score, doc_id) > position]
+    return rows[:limit]
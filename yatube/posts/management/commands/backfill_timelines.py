@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Follow, User
+from posts.timeline import rebuild_timeline
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок по существующим подпискам.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            dest='usernames',
+            action='append',
+            help='Пересобрать ленту только этого пользователя.',
+        )
+
+    def handle(self, *args, **options):
+        if options['usernames']:
+            user_ids = User.objects.filter(
+                username__in=options['usernames']
+            ).values_list('pk', flat=True)
+        else:
+            user_ids = (
+                Follow.objects.order_by('user_id')
+                .values_list('user_id', flat=True).distinct()
+            )
+        total = 0
+        for user_id in user_ids.iterator():
+            with transaction.atomic():
+                rebuild_timeline(user_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f'Пересобрано лент: {total}'))
@@ -0,0 +1,104 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from posts import merge_feed
+from posts.models import Follow, Post, User
+from posts.timeline import rebuild_timeline
+from posts.utils import paginator
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает построение первой страницы ленты подписок: запрос '
+        'ORM, материализованная лента и k-way merge. Тестовые данные '
+        'создаются в транзакции и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--authors', type=int, nargs='+', default=[10, 100, 1000],
+            help='Сколько авторов читает пользователь.',
+        )
+        parser.add_argument(
+            '--posts-per-author', type=int, default=20,
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Сколько раз строить страницу для каждого варианта.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"авторов":>8} {"orm, мс":>10} {"timeline, мс":>13} '
+            f'{"merge, мс":>10}'
+        )
+        for authors in options['authors']:
+            try:
+                with transaction.atomic():
+                    self.run(authors, options)
+                    raise Rollback
+            except Rollback:
+                pass
+
+    def run(self, authors, options):
+        reader = User.objects.create_user(username='bench_reader')
+        User.objects.bulk_create(
+            User(username=f'bench_author_{i}') for i in range(authors)
+        )
+        author_ids = list(
+            User.objects.filter(username__startswith='bench_author_')
+            .values_list('pk', flat=True)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=reader, author_id=pk) for pk in author_ids
+        )
+        Post.objects.bulk_create(
+            Post(author_id=pk, text='Тестовый пост')
+            for pk in author_ids
+            for _ in range(options['posts_per_author'])
+        )
+        rebuild_timeline(reader.pk)
+        request = RequestFactory().get('/follow/')
+        request.user = reader
+
+        def orm():
+            posts = Post.objects.filter(author__following__user=reader)
+            list(paginator(request, posts.select_related('author', 'group')))
+
+        def timeline():
+            entries = reader.timeline.select_related(
+                'post__author', 'post__group'
+            )
+            page_obj = paginator(request, entries, ('pub_date', 'post_id'))
+            [entry.post for entry in page_obj]
+
+        def merge():
+            ids = reader.follower.values_list('author_id', flat=True)
+            list(merge_feed.merged_feed_page(request, ids))
+
+        try:
+            merge()
+            timings = [
+                self.measure(variant, options['repeat'])
+                for variant in (orm, timeline, merge)
+            ]
+        finally:
+            merge_feed.forget_authors(author_ids)
+        self.stdout.write(
+            f'{authors:>8} {timings[0]:>10.2f} {timings[1]:>13.2f} '
+            f'{timings[2]:>10.2f}'
+        )
+
+    @staticmethod
+    def measure(variant, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            variant()
+        return (time.perf_counter() - started) * 1000 / repeat
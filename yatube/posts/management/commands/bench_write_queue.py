@@ -0,0 +1,99 @@
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from posts import write_queue
+from posts.models import Comment, Post, User
+from yatube import settings_production
+
+POSTS = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает запись комментариев из многих потоков: каждый в своей '
+        'транзакции и через очередь записей (posts.write_queue). База '
+        'с PRAGMA профиля продакшена создаётся с миграциями во временном '
+        'каталоге.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Сколько потоков пишут комментарии.')
+        parser.add_argument('--seconds', type=float, default=3)
+        parser.add_argument(
+            '--synchronous', default=None,
+            help='PRAGMA synchronous вместо профиля продакшена, например '
+                 'full.',
+        )
+        parser.add_argument(
+            '--directory', default=None,
+            help='Где создать базу (по умолчанию во временном каталоге).',
+        )
+
+    def handle(self, *args, **options):
+        creation = connection.creation
+        pragmas = dict(settings_production.SQLITE_PRAGMAS)
+        if options['synchronous']:
+            pragmas['synchronous'] = options['synchronous']
+        directory = tempfile.mkdtemp(dir=options['directory'])
+        connection.settings_dict['TEST']['NAME'] = os.path.join(
+            directory, 'bench.sqlite3'
+        )
+        try:
+            with override_settings(SQLITE_PRAGMAS=pragmas):
+                old_name = creation.create_test_db(
+                    verbosity=0, autoclobber=True, serialize=False
+                )
+                try:
+                    self.compare(options)
+                finally:
+                    creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def compare(self, options):
+        users = [User.objects.create_user(username=f'bench_{i}')
+                 for i in range(options['workers'])]
+        Post.objects.bulk_create(
+            Post(author=users[0], text='Пост') for _ in range(POSTS)
+        )
+        posts = list(Post.objects.values_list('pk', flat=True))
+        self.stdout.write(f'{"режим":>8} {"записей/с":>10}')
+        rates = {}
+        for mode, enabled in (('direct', False), ('queue', True)):
+            with override_settings(WRITE_QUEUE=enabled):
+                rates[mode] = self.run(users, posts, options['seconds'])
+            self.stdout.write(f'{mode:>8} {rates[mode]:>10.0f}')
+        gain = rates['queue'] / max(rates['direct'], 1)
+        self.stdout.write(f'Записей больше в {gain:.1f} раза.')
+
+    def run(self, users, posts, seconds):
+        written = []
+        deadline = time.monotonic() + seconds
+
+        def comment(user):
+            count = 0
+            while time.monotonic() < deadline:
+                write_queue.write(Comment(
+                    post_id=random.choice(posts), author=user,
+                    text='Комментарий',
+                ).save)
+                count += 1
+            written.append(count)
+            connection.close()
+
+        threads = [threading.Thread(target=comment, args=(user,))
+                   for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sum(written) / seconds
@@ -0,0 +1,32 @@
+import posixpath
+
+from django.core.management.base import BaseCommand
+
+from posts.storage import delete_unused, image_storage, name_digest
+
+DIRECTORY = 'posts'
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов, на которые не ссылается ни один пост. '
+        'Файлы, загруженные недавно (IMAGE_DELETE_GRACE), остаются до '
+        'следующего запуска.'
+    )
+
+    def handle(self, *args, **options):
+        deleted = 0
+        for name in self.content_names():
+            deleted += delete_unused(name)
+        self.stdout.write(self.style.SUCCESS(f'Удалено файлов: {deleted}'))
+
+    def content_names(self):
+        if not image_storage.exists(DIRECTORY):
+            return
+        shards, _ = image_storage.listdir(DIRECTORY)
+        for shard in shards:
+            directory = posixpath.join(DIRECTORY, shard)
+            for filename in image_storage.listdir(directory)[1]:
+                name = posixpath.join(directory, filename)
+                if name_digest(name):
+                    yield name
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts.export import CHUNK_SIZE, EXPORTS, FORMATS, export_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты или комментарии в JSONL или CSV потоком, '
+        'в постоянной памяти; по желанию сжимает в gzip.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--author', help='Только записи этого автора.')
+        parser.add_argument('--group', help='Только записи этой группы.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument(
+            '--output', '-o', help='Файл выгрузки; по умолчанию stdout.'
+        )
+
+    def handle(self, *args, **options):
+        chunks = export_chunks(
+            options['kind'], options['format'], options['gzip'],
+            author=options['author'], group=options['group'],
+            chunk_size=options['chunk_size'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+            return
+        output = sys.stdout.buffer
+        for chunk in chunks:
+            output.write(chunk)
+        output.flush()
@@ -0,0 +1,306 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import merge_feed, search
+from posts.caching import bump_generation
+from posts.models import (Comment, Follow, Group, ImportedComment,
+                          ImportedPost, Post, User)
+
+TYPES = ('post', 'comment', 'follow')
+PROGRESS_INTERVAL = 5
+
+
+class IdMap:
+    """Кеш «ключ → id»; недостающие объекты создаются пачкой.
+
+    Растёт с числом разных авторов и групп, а не с числом записей.
+    """
+
+    def __init__(self, model, field, defaults):
+        self.model = model
+        self.field = field
+        self.defaults = defaults
+        self.ids = {}
+
+    def lookup(self, keys):
+        return dict(
+            self.model.objects.filter(**{f'{self.field}__in': keys})
+            .values_list(self.field, 'pk')
+        )
+
+    def resolve(self, keys):
+        missing = {key for key in keys if key} - self.ids.keys()
+        if missing:
+            found = self.lookup(missing)
+            absent = missing - found.keys()
+            if absent:
+                self.model.objects.bulk_create(
+                    (self.model(**{self.field: key}, **self.defaults(key))
+                     for key in absent),
+                    ignore_conflicts=True,
+                )
+                found.update(self.lookup(absent))
+            self.ids.update(found)
+        return self.ids
+
+
+def imported(model, keys):
+    """Карта «id в источнике → id объекта» по ImportedPost/Comment."""
+    return dict(
+        model.objects.filter(external_id__in=keys)
+        .values_list('external_id', 'pk')
+    )
+
+
+def insert(objects):
+    """Сохраняет объекты так же, как loaddata: id выдаёт база.
+
+    С ``raw`` даты из источника не заменяются на auto_now_add, а сигналы
+    не трогают ленты и счётчики — их досчитывает refresh_derived.
+    bulk_create на SQLite не возвращает id, а без них не записать карту
+    импортированных объектов.
+    """
+    for obj in objects:
+        obj.save_base(raw=True)
+
+
+def parse_date(value):
+    date = parse_datetime(value) if value else None
+    if date is None:
+        return timezone.now()
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково импортирует посты, комментарии и подписки из JSONL или '
+        'CSV пачками, по транзакции на пачку. Прогресс сохраняется в '
+        'контрольной точке, прерванный импорт продолжается с неё.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .jsonl или .csv.')
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'),
+            help='Формат файла; по умолчанию — по расширению.',
+        )
+        parser.add_argument(
+            '--type', choices=TYPES,
+            help='Тип записей без поля type (обычно для CSV).',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки; по умолчанию <path>.checkpoint.',
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не глядя на контрольную точку.',
+        )
+        parser.add_argument(
+            '--skip-derived', action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (
+            'csv' if path.lower().endswith('.csv') else 'jsonl'
+        )
+        self.default_type = options['type']
+        self.checkpoint_path = (
+            options['checkpoint'] or f'{path}.checkpoint'
+        )
+        self.state = self.load_checkpoint(path, options['restart'])
+        self.authors = IdMap(
+            User, 'username', lambda key: {'password': make_password(None)}
+        )
+        self.groups = IdMap(
+            Group, 'slug', lambda key: {'title': key, 'description': ''}
+        )
+        self.imported_authors = set()
+        self.started = self.reported = time.monotonic()
+        self.imported_before = self.state['records']
+        with open(path, 'rb') as source:
+            records = (self.read_csv(source) if fmt == 'csv'
+                       else self.read_jsonl(source))
+            for batch in self.batches(records, options['batch_size']):
+                with transaction.atomic():
+                    for record_type in TYPES:
+                        rows = [row for row, _ in batch
+                                if self.record_type(row) == record_type]
+                        if rows:
+                            getattr(self, f'import_{record_type}s')(rows)
+                self.state['offset'] = batch[-1][1]
+                self.state['records'] += len(batch)
+                self.save_checkpoint()
+                self.report()
+        self.report(final=True)
+        if self.state['records'] > self.imported_before and not (
+            options['skip_derived']
+        ):
+            self.refresh_derived()
+
+    def load_checkpoint(self, path, restart):
+        source = os.path.abspath(path)
+        if not restart and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as checkpoint:
+                state = json.load(checkpoint)
+            if state['source'] != source:
+                raise CommandError(
+                    f'Контрольная точка {self.checkpoint_path} относится к '
+                    f'{state["source"]}; укажите --restart или --checkpoint.'
+                )
+            self.stdout.write(
+                f'Продолжаем с записи {state["records"]}'
+            )
+            return state
+        # Посты находят по ImportedPost, поэтому комментарии можно
+        # импортировать отдельным файлом и запуском.
+        return {'source': source, 'offset': 0, 'records': 0, 'skipped': 0}
+
+    def save_checkpoint(self):
+        temporary = f'{self.checkpoint_path}.tmp'
+        with open(temporary, 'w') as checkpoint:
+            json.dump(self.state, checkpoint)
+        os.replace(temporary, self.checkpoint_path)
+
+    def read_jsonl(self, source):
+        """Записи (словарь, смещение после неё) начиная с контрольной точки."""
+        source.seek(self.state['offset'])
+        for line in iter(source.readline, b''):
+            if line.strip():
+                yield json.loads(line), source.tell()
+
+    def read_csv(self, source):
+        header = next(csv.reader([source.readline().decode('utf-8-sig')]))
+        source.seek(max(self.state['offset'], source.tell()))
+        lines = (line.decode() for line in iter(source.readline, b''))
+        for row in csv.reader(lines):
+            if row:
+                yield dict(zip(header, row)), source.tell()
+
+    @staticmethod
+    def batches(records, size):
+        while True:
+            batch = list(islice(records, size))
+            if not batch:
+                return
+            yield batch
+
+    def record_type(self, row):
+        record_type = row.get('type') or self.default_type
+        if record_type not in TYPES:
+            raise CommandError(
+                f'Неизвестный тип записи {record_type!r}; укажите --type.'
+            )
+        return record_type
+
+    def new_rows(self, model, rows):
+        """Строки с ещё не импортированными id; остальные пропускаются."""
+        count = len(rows)
+        rows = {str(row['id']): row for row in rows}
+        known = imported(model, rows)
+        rows = {key: row for key, row in rows.items() if key not in known}
+        self.state['skipped'] += count - len(rows)
+        return rows
+
+    def import_posts(self, rows):
+        rows = self.new_rows(ImportedPost, rows)
+        if not rows:
+            return
+        authors = self.authors.resolve(row['author'] for row in rows.values())
+        groups = self.groups.resolve(row.get('group') for row in rows.values())
+        posts = {
+            key: Post(
+                author_id=authors[row['author']],
+                group_id=groups.get(row.get('group')),
+                text=row['text'],
+                pub_date=parse_date(row.get('pub_date')),
+            )
+            for key, row in rows.items()
+        }
+        insert(posts.values())
+        ImportedPost.objects.bulk_create(
+            ImportedPost(post_id=post.pk, external_id=key)
+            for key, post in posts.items()
+        )
+        self.imported_authors.update(
+            post.author_id for post in posts.values()
+        )
+
+    def import_comments(self, rows):
+        rows = self.new_rows(ImportedComment, rows)
+        post_ids = imported(
+            ImportedPost, {str(row['post']) for row in rows.values()}
+        )
+        count = len(rows)
+        rows = {key: row for key, row in rows.items()
+                if str(row['post']) in post_ids}
+        self.state['skipped'] += count - len(rows)
+        authors = self.authors.resolve(row['author'] for row in rows.values())
+        comments = {
+            key: Comment(
+                post_id=post_ids[str(row['post'])],
+                author_id=authors[row['author']],
+                text=row['text'],
+                created=parse_date(row.get('created')),
+            )
+            for key, row in rows.items()
+        }
+        insert(comments.values())
+        ImportedComment.objects.bulk_create(
+            ImportedComment(comment_id=comment.pk, external_id=key)
+            for key, comment in comments.items()
+        )
+
+    def import_follows(self, rows):
+        users = self.authors.resolve(
+            name for row in rows for name in (row['user'], row['author'])
+        )
+        pairs = {(users[row['user']], users[row['author']])
+                 for row in rows if row['user'] != row['author']}
+        existing = set(
+            Follow.objects.filter(
+                user_id__in={user for user, _ in pairs},
+                author_id__in={author for _, author in pairs},
+            ).values_list('user_id', 'author_id')
+        )
+        follows = [Follow(user_id=user, author_id=author)
+                   for user, author in pairs - existing]
+        self.state['skipped'] += len(rows) - len(follows)
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+
+    def report(self, final=False):
+        now = time.monotonic()
+        if not final and now - self.reported < PROGRESS_INTERVAL:
+            return
+        self.reported = now
+        imported = self.state['records'] - self.imported_before
+        rate = imported / max(now - self.started, 1e-9)
+        message = (
+            f'Записей: {self.state["records"]}, пропущено: '
+            f'{self.state["skipped"]}, {rate:.0f} в секунду'
+        )
+        self.stdout.write(self.style.SUCCESS(message) if final else message)
+
+    def refresh_derived(self):
+        """bulk_create обходит сигналы: досчитываем производные данные."""
+        call_command('repair_counters', stdout=self.stdout)
+        call_command('backfill_timelines', stdout=self.stdout)
+        merge_feed.forget_authors(self.imported_authors)
+        if search.backend() == 'index':
+            search.rebuild_index()
+        bump_generation('posts')
@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from core.processes import setup_django
+from posts.models import Post
+from posts.thumbnails import (find_variants, render_post_variants,
+                              store_variants)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт варианты (WebP и JPEG разной ширины) для всех картинок '
+        'постов на всех ядрах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов; 1 — без пула, в текущем процессе.',
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Обработать и уже зарегистрированные картинки.',
+        )
+
+    def handle(self, *args, **options):
+        names = [
+            name for name in
+            Post.objects.exclude(image='').order_by()
+            .values_list('image', flat=True).distinct().iterator()
+            if options['force'] or find_variants(name) is None
+        ]
+        started = time.monotonic()
+        if options['workers'] == 1:
+            created = self.store(names, map(render_post_variants, names))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=options['workers'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=setup_django,
+            ) as executor:
+                results = executor.map(
+                    render_post_variants, names, chunksize=8
+                )
+                created = self.store(names, results)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Картинок обработано: {created} из {len(names)} '
+            f'за {elapsed:.1f} с'
+        ))
+
+    def store(self, names, results):
+        created = 0
+        for name, variants in zip(names, results):
+            if variants is not None:
+                store_variants(name, variants)
+                created += 1
+        return created
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново строит поисковый индекс SEARCH_BACKEND: таблицу FTS5 '
+        'posts_search или файлы инвертированного индекса. Нужен после '
+        'восстановления базы из дампа или правок мимо триггеров и сигналов.'
+    )
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {Post.objects.count()}'
+        ))
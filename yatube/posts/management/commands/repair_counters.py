@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+
+from posts.counters import actual_comment_counts, actual_user_counters
+from posts.models import Post, UserCounters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет денормализованные счётчики с данными и исправляет их.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сообщить о расхождениях, ничего не меняя.',
+        )
+
+    def handle(self, *args, **options):
+        check_only = options['check']
+        with transaction.atomic():
+            users = self.repair_users(check_only)
+            posts = self.repair_posts(check_only)
+        message = (
+            f'Расхождений: пользователей — {users}, постов — {posts}'
+        )
+        if check_only and (users or posts):
+            raise CommandError(message)
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def repair_users(self, check_only):
+        drifted = 0
+        missing = []
+        rows = actual_user_counters().values_list(
+            'pk', 'actual_posts', 'actual_followers', 'actual_following',
+            'counters__user_id', 'counters__posts_count',
+            'counters__followers_count', 'counters__following_count',
+        )
+        for pk, posts, followers, following, row, *stored in rows.iterator():
+            actual = {
+                'posts_count': posts,
+                'followers_count': followers,
+                'following_count': following,
+            }
+            if row is None:
+                # Строки создаются лениво (get_counters): отсутствие
+                # строки — не расхождение.
+                missing.append(UserCounters(user_id=pk, **actual))
+                continue
+            if stored == [posts, followers, following]:
+                continue
+            drifted += 1
+            if not check_only:
+                UserCounters.objects.filter(user_id=pk).update(**actual)
+        if not check_only:
+            UserCounters.objects.bulk_create(missing, ignore_conflicts=True)
+        return drifted
+
+    def repair_posts(self, check_only):
+        drifted = actual_comment_counts().exclude(
+            comments_count=F('actual_comments')
+        ).values_list('pk', 'actual_comments')
+        drifted = list(drifted)
+        if not check_only:
+            for pk, comments in drifted:
+                Post.objects.filter(pk=pk).update(comments_count=comments)
+        return len(drifted)
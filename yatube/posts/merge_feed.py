@@ -0,0 +1,182 @@
+"""Ленты как k-way merge списков свежих постов авторов (pull-модель).
+
+Для каждого автора в кеше лежит ограниченный список его последних постов
+в виде ``array('q')``: пары (pub_date в микросекундах, id), от новых к
+старым. Лента подписок собирается слиянием таких списков через heapq,
+без соединения ``author__following__user`` и без записи в ленты всех
+подписчиков при публикации.
+
+Список длиной RECENT_POSTS_PER_AUTHOR мог потерять старые посты, поэтому
+слияние надёжно только до самой новой из «границ» полных списков.
+Страницы глубже этой границы строятся обычным запросом к Post.
+
+Ключ списка включает поколение автора (см. posts.caching). Новый или
+удалённый пост после фиксации увеличивает поколение, и список строится
+заново при следующем чтении. Правка списка на месте (get, изменить, set)
+теряла бы посты при одновременных публикациях, а список, прочитанный из
+базы до фиксации, ложится под уже устаревшее поколение.
+"""
+import heapq
+from array import array
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import bump_generation, get_generations
+from .models import Post
+from .utils import (CURSOR_PREVIOUS, POSTS_PER_PAGE, CursorPaginator,
+                    cursor_requested, decode_cursor, paginator)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def recent_posts_scope(author_id):
+    return f'recent:{author_id}'
+
+
+def recent_posts_keys(author_ids):
+    """{ключ списка в кеше: author_id} для текущих поколений авторов."""
+    author_ids = list(author_ids)
+    generations = get_generations(map(recent_posts_scope, author_ids))
+    return {
+        f'posts:recent:{author_id}:{generation}': author_id
+        for author_id, generation in zip(author_ids, generations)
+    }
+
+
+def post_key(pub_date, pk):
+    return (pub_date - EPOCH) // MICROSECOND, pk
+
+
+def pack(keys):
+    return array('q', [value for key in keys for value in key]).tobytes()
+
+
+def unpack(raw):
+    values = array('q')
+    values.frombytes(raw)
+    return values
+
+
+def iter_keys(values):
+    """Ленивый обход пар массива: слиянию обычно нужны лишь первые."""
+    values = iter(values)
+    return zip(values, values)
+
+
+def load_recent_posts(author_ids):
+    """Возвращает {author_id: array('q')}, достраивая промахи кеша."""
+    keys = recent_posts_keys(author_ids)
+    cached = cache.get_many(keys)
+    lists = {keys[key]: unpack(raw) for key, raw in cached.items()}
+    missing = {}
+    for key, author_id in keys.items():
+        if author_id in lists:
+            continue
+        rows = (
+            Post.objects.filter(author_id=author_id)
+            .order_by('-pub_date', '-pk')
+            .values_list('pub_date', 'pk')
+            [:settings.RECENT_POSTS_PER_AUTHOR]
+        )
+        raw = pack(post_key(pub_date, pk) for pub_date, pk in rows)
+        lists[author_id] = unpack(raw)
+        missing[key] = raw
+    if missing:
+        cache.set_many(missing, timeout=None)
+    return lists
+
+
+def forget_authors(author_ids):
+    """Сбрасывает списки авторов, когда транзакция зафиксирована."""
+    scopes = [recent_posts_scope(pk) for pk in author_ids]
+    if scopes:
+        transaction.on_commit(lambda: bump_generation(*scopes))
+
+
+def merge_keys(author_ids, position, direction, limit):
+    """Ключи постов страницы или None, если списков не хватает.
+
+    ``position`` — ключ курсора; для прямого направления берутся посты
+    старше него, для обратного — новее.
+    """
+    lists = load_recent_posts(author_ids).values()
+    horizon = max(
+        ((values[-2], values[-1]) for values in lists
+         if len(values) >= 2 * settings.RECENT_POSTS_PER_AUTHOR),
+        default=None,
+    )
+    merged = heapq.merge(*map(iter_keys, lists), reverse=True)
+    if direction == CURSOR_PREVIOUS:
+        if horizon is not None and position < horizon:
+            return None
+        window = deque(maxlen=limit)
+        for key in merged:
+            if key <= position:
+                break
+            window.append(key)
+        return list(window)
+    result = []
+    for key in merged:
+        if position is not None and key >= position:
+            continue
+        if horizon is not None and key < horizon:
+            return None
+        result.append(key)
+        if len(result) == limit:
+            return result
+    if horizon is not None:
+        return None
+    return result
+
+
+def fetch_posts(keys, author_ids):
+    """Загружает посты по ключам; None, если кеш разошёлся с базой."""
+    posts = (Post.objects.select_related('author', 'group')
+             .in_bulk([pk for _, pk in keys]))
+    items = []
+    for key in keys:
+        post = posts.get(key[1])
+        if (post is None or post.author_id not in author_ids
+                or post_key(post.pub_date, post.pk) != key):
+            forget_authors(author_ids)
+            return None
+        items.append(post)
+    return items
+
+
+def merged_feed_page(request, author_ids):
+    """Страница ленты постов авторов ``author_ids`` для paginator.html."""
+    author_ids = set(author_ids)
+    queryset = (Post.objects.filter(author_id__in=author_ids)
+                .select_related('author', 'group'))
+    if not cursor_requested(request):
+        return paginator(request, queryset)
+    cursor_paginator = CursorPaginator(queryset, POSTS_PER_PAGE)
+    cursor = request.GET.get('cursor')
+    direction, position = None, None
+    decoded = decode_cursor(cursor)
+    if decoded is not None:
+        direction, pub_date, pk = decoded
+        position = post_key(pub_date, pk)
+    keys = merge_keys(author_ids, position, direction, POSTS_PER_PAGE + 1)
+    items = None if keys is None else fetch_posts(keys, author_ids)
+    if items is None:
+        return cursor_paginator.get_page(cursor)
+    has_more = len(items) > POSTS_PER_PAGE
+    if direction == CURSOR_PREVIOUS:
+        if not items:
+            return cursor_paginator.get_page(None)
+        items = items[-POSTS_PER_PAGE:]
+        return cursor_paginator.build_page(
+            items, has_next=True, has_previous=has_more
+        )
+    return cursor_paginator.build_page(
+        items[:POSTS_PER_PAGE],
+        has_next=has_more,
+        has_previous=position is not None and bool(items),
+    )
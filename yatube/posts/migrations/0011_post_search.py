@@ -0,0 +1,87 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:05
+
+from django.db import migrations
+
+# «ё» в индексе хранится как «е»: unicode61 не снимает с неё диакритику.
+NORMALIZE = "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')"
+POST_COMMENTS = (
+    "(SELECT coalesce(group_concat({}, ' '), '') FROM posts_comment "
+    "WHERE post_id = {{}})".format(NORMALIZE.format('text'))
+)
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE posts_search USING fts5("
+    "text, comments, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+
+    "INSERT INTO posts_search (rowid, text, comments) "
+    "SELECT id, {}, {} FROM posts_post".format(
+        NORMALIZE.format('text'), POST_COMMENTS.format('posts_post.id')
+    ),
+
+    "CREATE TRIGGER posts_search_post_insert AFTER INSERT ON posts_post "
+    "BEGIN INSERT INTO posts_search (rowid, text, comments) "
+    "VALUES (new.id, {}, ''); END".format(NORMALIZE.format('new.text')),
+
+    "CREATE TRIGGER posts_search_post_update AFTER UPDATE OF text "
+    "ON posts_post BEGIN UPDATE posts_search SET text = {} "
+    "WHERE rowid = new.id; END".format(NORMALIZE.format('new.text')),
+
+    "CREATE TRIGGER posts_search_post_delete AFTER DELETE ON posts_post "
+    "BEGIN DELETE FROM posts_search WHERE rowid = old.id; END",
+] + [
+    "CREATE TRIGGER posts_search_comment_{event} AFTER {event_sql} "
+    "ON posts_comment BEGIN UPDATE posts_search SET comments = {comments} "
+    "WHERE rowid = {row}.post_id; END".format(
+        event=event, event_sql=event.upper(), row=row,
+        comments=POST_COMMENTS.format(f'{row}.post_id')
+    )
+    for event, row in (
+        ('insert', 'new'), ('update', 'new'), ('delete', 'old')
+    )
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS posts_search_post_insert',
+    'DROP TRIGGER IF EXISTS posts_search_post_update',
+    'DROP TRIGGER IF EXISTS posts_search_post_delete',
+    'DROP TRIGGER IF EXISTS posts_search_comment_insert',
+    'DROP TRIGGER IF EXISTS posts_search_comment_update',
+    'DROP TRIGGER IF EXISTS posts_search_comment_delete',
+    'DROP TABLE IF EXISTS posts_search',
+]
+
+
+def fts5_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search(apps, schema_editor):
+    # Без FTS5 таблицы нет, и поиск идёт по инвертированному индексу
+    # (posts.search.backend).
+    if not fts5_available(schema_editor.connection):
+        return
+    for sql in CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, drop_search),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:40
+
+from importlib import import_module
+
+from django.db import migrations, models
+import posts.storage
+
+search = import_module('posts.migrations.0011_post_search')
+
+# SQLite пересоздаёт таблицу при AlterField, и триггеры поискового
+# индекса на posts_post пропадают вместе со старой таблицей.
+POST_TRIGGERS_SQL = [
+    sql.replace('CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS')
+    for sql in search.CREATE_SQL if ' ON posts_post ' in sql
+]
+
+
+def create_post_triggers(apps, schema_editor):
+    connection = schema_editor.connection
+    if 'posts_search' not in connection.introspection.table_names():
+        return
+    for sql in POST_TRIGGERS_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop,
+                             create_post_triggers),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(create_post_triggers,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 2.2.16 on 2026-10-18 22:10
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    """Оставляет по одной подписке на пару (user, author).
+
+    Ограничение unique_follow было объявлено вне модели и не действовало,
+    так что повторы могли накопиться. Счётчики подписок уменьшаются на
+    число удалённых повторов.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    UserCounters = apps.get_model('posts', 'UserCounters')
+    duplicates = (
+        Follow.objects.values('user_id', 'author_id')
+        .annotate(first=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+    for pair in duplicates:
+        Follow.objects.filter(
+            user_id=pair['user_id'], author_id=pair['author_id']
+        ).exclude(id=pair['first']).delete()
+        extra = pair['total'] - 1
+        UserCounters.objects.filter(user_id=pair['user_id']).update(
+            following_count=F('following_count') - extra
+        )
+        UserCounters.objects.filter(user_id=pair['author_id']).update(
+            followers_count=F('followers_count') - extra
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='timelineentry',
+            name='timeline_user_pub_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'pub_date', 'post'], name='timeline_user_pub_post_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'pub_date'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created'], name='comment_post_created_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='import_key', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('external_id', models.CharField(max_length=64, unique=True, verbose_name='Id в источнике')),
+            ],
+            options={
+                'verbose_name': 'Импортированный пост',
+                'verbose_name_plural': 'Импортированные посты',
+            },
+        ),
+    ]
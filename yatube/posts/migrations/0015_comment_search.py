@@ -0,0 +1,89 @@
+# Generated by Django 2.2.16 on 2026-10-18 23:20
+
+from importlib import import_module
+
+from django.db import migrations
+
+search = import_module('posts.migrations.0011_post_search')
+NORMALIZE = search.NORMALIZE
+
+# Комментарий — отдельная строка своей таблицы с rowid, равным id
+# комментария. Триггер на запись комментария трогает одну строку
+# индекса, а не пересобирает все комментарии поста.
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE posts_search USING fts5("
+    "text, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+
+    "INSERT INTO posts_search (rowid, text) "
+    "SELECT id, {} FROM posts_post".format(NORMALIZE.format('text')),
+
+    "CREATE TRIGGER posts_search_post_insert AFTER INSERT ON posts_post "
+    "BEGIN INSERT INTO posts_search (rowid, text) "
+    "VALUES (new.id, {}); END".format(NORMALIZE.format('new.text')),
+
+    "CREATE TRIGGER posts_search_post_update AFTER UPDATE OF text "
+    "ON posts_post BEGIN UPDATE posts_search SET text = {} "
+    "WHERE rowid = new.id; END".format(NORMALIZE.format('new.text')),
+
+    "CREATE TRIGGER posts_search_post_delete AFTER DELETE ON posts_post "
+    "BEGIN DELETE FROM posts_search WHERE rowid = old.id; END",
+
+    "CREATE VIRTUAL TABLE posts_comment_search USING fts5("
+    "text, post_id UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+
+    "INSERT INTO posts_comment_search (rowid, text, post_id) "
+    "SELECT id, {}, post_id FROM posts_comment".format(
+        NORMALIZE.format('text')
+    ),
+
+    "CREATE TRIGGER posts_comment_search_insert AFTER INSERT "
+    "ON posts_comment BEGIN INSERT INTO posts_comment_search "
+    "(rowid, text, post_id) VALUES (new.id, {}, new.post_id); END".format(
+        NORMALIZE.format('new.text')
+    ),
+
+    "CREATE TRIGGER posts_comment_search_update AFTER UPDATE OF text, "
+    "post_id ON posts_comment BEGIN UPDATE posts_comment_search "
+    "SET text = {}, post_id = new.post_id WHERE rowid = new.id; END".format(
+        NORMALIZE.format('new.text')
+    ),
+
+    "CREATE TRIGGER posts_comment_search_delete AFTER DELETE "
+    "ON posts_comment BEGIN DELETE FROM posts_comment_search "
+    "WHERE rowid = old.id; END",
+]
+
+DROP_SQL = [
+    'DROP TRIGGER IF EXISTS posts_comment_search_insert',
+    'DROP TRIGGER IF EXISTS posts_comment_search_update',
+    'DROP TRIGGER IF EXISTS posts_comment_search_delete',
+    'DROP TABLE IF EXISTS posts_comment_search',
+] + search.DROP_SQL
+
+
+def create_search(apps, schema_editor):
+    connection = schema_editor.connection
+    if 'posts_search' not in connection.introspection.table_names():
+        return
+    for sql in search.DROP_SQL + CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+def restore_search(apps, schema_editor):
+    connection = schema_editor.connection
+    if 'posts_search' not in connection.introspection.table_names():
+        return
+    for sql in DROP_SQL + search.CREATE_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_imported_post'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search, restore_search),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 23:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_comment_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedComment',
+            fields=[
+                ('comment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='import_key', serialize=False, to='posts.Comment', verbose_name='Комментарий')),
+                ('external_id', models.CharField(max_length=64, unique=True, verbose_name='Id в источнике')),
+            ],
+            options={
+                'verbose_name': 'Импортированный комментарий',
+                'verbose_name_plural': 'Импортированные комментарии',
+            },
+        ),
+    ]
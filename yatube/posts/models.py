@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import image_storage
+
 
 User = get_user_model()
 
@@ -32,13 +34,29 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=image_storage,
+        blank=True,
+        db_index=True
+    )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
     )
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Ленты автора и группы идут по (pub_date, id) от новых к старым.
+        # Индексы по возрастанию: SQLite читает их с конца, и rowid в
+        # конце записи индекса даёт и порядок по id без сортировки.
+        indexes = [
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -69,6 +87,10 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text
@@ -88,9 +110,96 @@ class Follow(models.Model):
         verbose_name='Автор'
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'author'],
+                                    name='unique_follow')
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Строка материализованной ленты подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date', '-post_id')
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='timeline_user_pub_post_idx')
+        ]
+
+
+class UserCounters(models.Model):
+    """Денормализованные счётчики пользователя для профиля и поста."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class ImportedPost(models.Model):
+    """Id поста в источнике import_content.
+
+    По нему комментарии из другого файла или запуска находят свой пост.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='import_key',
+        verbose_name='Пост'
+    )
+    external_id = models.CharField('Id в источнике', max_length=64,
+                                   unique=True)
+
+    class Meta:
+        verbose_name = 'Импортированный пост'
+        verbose_name_plural = 'Импортированные посты'
+
+
+class ImportedComment(models.Model):
+    """Id комментария в источнике import_content.
 
-class Meta:
-    constraints = [
-        models.UniqueConstraint(fields=['user', 'author'],
-                                name='unique_follow')
-    ]
+    Повторный импорт того же файла не создаёт комментарии заново.
+    """
+    comment = models.OneToOneField(
+        Comment,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='import_key',
+        verbose_name='Комментарий'
+    )
+    external_id = models.CharField('Id в источнике', max_length=64,
+                                   unique=True)
+
+    class Meta:
+        verbose_name = 'Импортированный комментарий'
+        verbose_name_plural = 'Импортированные комментарии'
@@ -0,0 +1,154 @@
+"""Полнотекстовый поиск по постам и комментариям на SQLite FTS5.
+
+Виртуальные таблицы создаются миграциями 0011 и 0015: в
+``posts_search`` rowid строки равен id поста, в ``posts_comment_search``
+— id комментария, а ``post_id`` указывает на его пост. Совпадения
+собираются по посту при запросе. Таблицы поддерживают триггеры базы,
+поэтому в индекс попадают и ``bulk_create``, и правки из админки.
+
+Токенизатор unicode61 приводит кириллицу к нижнему регистру, «ё»
+заменяется на «е» и в индексе, и в запросе. Стемминга в FTS5 нет,
+поэтому слова запроса приводятся к основе стеммером Snowball, а основа
+ищется как префикс. Результаты упорядочены по bm25.
+
+С ``SEARCH_BACKEND = 'index'`` вместо FTS5 используется инвертированный
+индекс из posts.inverted_index. Он же используется, если таблицы FTS5
+нет: миграция создаёт её только на SQLite, собранном с FTS5.
+"""
+import base64
+import binascii
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from . import inverted_index
+from .models import Post
+from .stemmer import stem
+from .utils import POSTS_PER_PAGE
+
+# Совпадение в тексте поста весит больше, чем в комментариях.
+TEXT_WEIGHT = 1.0
+COMMENTS_WEIGHT = 0.3
+MAX_TERMS = 10
+
+REBUILD_SQL = [
+    'DELETE FROM posts_search',
+    "INSERT INTO posts_search (rowid, text) "
+    "SELECT id, replace(replace(text, 'ё', 'е'), 'Ё', 'Е') FROM posts_post",
+    "INSERT INTO posts_search (posts_search) VALUES ('optimize')",
+    'DELETE FROM posts_comment_search',
+    "INSERT INTO posts_comment_search (rowid, text, post_id) "
+    "SELECT id, replace(replace(text, 'ё', 'е'), 'Ё', 'Е'), post_id "
+    "FROM posts_comment",
+    "INSERT INTO posts_comment_search (posts_comment_search) "
+    "VALUES ('optimize')",
+]
+
+# Оценка поста — сумма взвешенных bm25 его текста и совпавших
+# комментариев; каждый комментарий проиндексирован отдельной строкой.
+MATCHES_SQL = (
+    'SELECT post_id, sum(score) AS score FROM ('
+    'SELECT rowid AS post_id, %s * bm25(posts_search) AS score '
+    'FROM posts_search WHERE posts_search MATCH %s '
+    'UNION ALL '
+    'SELECT post_id, %s * bm25(posts_comment_search) AS score '
+    'FROM posts_comment_search WHERE posts_comment_search MATCH %s'
+    ') GROUP BY post_id'
+)
+
+
+@lru_cache(maxsize=None)
+def _has_search_table(database):
+    return 'posts_search' in connection.introspection.table_names()
+
+
+def backend():
+    """Действующий поисковый бэкенд: 'fts5' или 'index'."""
+    if (settings.SEARCH_BACKEND == 'fts5'
+            and not _has_search_table(connection.settings_dict['NAME'])):
+        return 'index'
+    return settings.SEARCH_BACKEND
+
+
+def normalize(text):
+    return text.lower().replace('ё', 'е')
+
+
+def match_expression(query):
+    """Выражение MATCH: все слова запроса как префиксы их основ.
+
+    Слова берутся по ``\\w+`` и заключаются в кавычки, так что
+    синтаксис FTS5 из пользовательского ввода не интерпретируется.
+    """
+    words = re.findall(r'\w+', normalize(query))[:MAX_TERMS]
+    return ' '.join(f'"{stem(word)}"*' for word in words)
+
+
+def encode_cursor(score, pk):
+    raw = f'{score!r}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (score, pk) или None для битого курсора."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, pk = base64.urlsafe_b64decode(padded.encode()).decode().split(
+            '|'
+        )
+        return float(score), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+def search_post_ids(query, position=None, limit=POSTS_PER_PAGE):
+    """Список (post_id, score) лучших совпадений после ``position``.
+
+    Меньший score означает лучшее совпадение. Страницы режутся по
+    ключу (score, id), как и в CursorPaginator, без OFFSET.
+    """
+    if backend() == 'index':
+        return inverted_index.search_post_ids(query, position, limit)
+    expression = match_expression(query)
+    if not expression:
+        return []
+    sql = f'SELECT post_id, score FROM ({MATCHES_SQL})'
+    params = [TEXT_WEIGHT, expression, COMMENTS_WEIGHT, expression]
+    if position is not None:
+        sql += ' WHERE score > %s OR (score = %s AND post_id > %s)'
+        score, pk = position
+        params += [score, score, pk]
+    sql += ' ORDER BY score, post_id LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def search_posts(query, cursor=None):
+    """Страница результатов поиска: (posts, next_cursor)."""
+    rows = search_post_ids(query, decode_cursor(cursor), POSTS_PER_PAGE + 1)
+    next_cursor = None
+    if len(rows) > POSTS_PER_PAGE:
+        rows = rows[:POSTS_PER_PAGE]
+        pk, score = rows[-1]
+        next_cursor = encode_cursor(score, pk)
+    posts = (Post.objects.select_related('author', 'group')
+             .in_bulk([pk for pk, _ in rows]))
+    return [posts[pk] for pk, _ in rows if pk in posts], next_cursor
+
+
+def rebuild_index():
+    """Заново строит индекс текущего бэкенда (см. ``backend``)."""
+    if backend() == 'index':
+        inverted_index.get_index().rebuild(
+            Post.objects.order_by().values_list('pk', 'text').iterator()
+        )
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql in REBUILD_SQL:
+            cursor.execute(sql)
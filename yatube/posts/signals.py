@@ -0,0 +1,155 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (counters, inverted_index, merge_feed, search, storage,
+               timeline)
+from .caching import bump_generation
+from .models import Comment, Follow, Group, Post, User
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.fan_out_post(instance)
+        merge_feed.forget_authors([instance.author_id])
+
+
+@receiver(post_delete, sender=Post)
+def drop_deleted_post(sender, instance, **kwargs):
+    merge_feed.forget_authors([instance.author_id])
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, update_fields=None,
+                     **kwargs):
+    if search.backend() != 'index' or raw:
+        return
+    if update_fields is None or 'text' in update_fields:
+        inverted_index.get_index().add(instance.pk, instance.text)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    if search.backend() == 'index':
+        inverted_index.get_index().remove(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def fill_timeline_on_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        timeline.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline_on_unfollow(sender, instance, **kwargs):
+    timeline.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_post_pages(sender, instance, **kwargs):
+    bump_generation('posts')
+
+
+@receiver(post_save, sender=Post)
+def invalidate_publication(sender, instance, **kwargs):
+    bump_generation(f'publication:post:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_publications(sender, instance, created,
+                                   update_fields=None, **kwargs):
+    # Вход в систему сохраняет только last_login, карточки от него
+    # не меняются.
+    if not created and update_fields != frozenset({'last_login'}):
+        bump_generation(f'publication:user:{instance.pk}')
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_publications(sender, instance, created, **kwargs):
+    if not created:
+        bump_generation(f'publication:group:{instance.pk}')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_detail(sender, instance, **kwargs):
+    bump_generation(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_user_counters(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_user_counters(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_follow_counters(
+            instance.user_id, instance.author_id, 1
+        )
+        invalidate_profiles(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_follow_counters(instance.user_id, instance.author_id, -1)
+    invalidate_profiles(instance)
+
+
+def invalidate_profiles(follow):
+    # Представления подписки передают пользователей в объект Follow,
+    # тогда их имена известны без запроса.
+    fields = [Follow._meta.get_field(name) for name in ('user', 'author')]
+    if all(field.is_cached(follow) for field in fields):
+        usernames = [follow.user.username, follow.author.username]
+    else:
+        usernames = User.objects.filter(
+            pk__in=[follow.user_id, follow.author_id]
+        ).values_list('username', flat=True)
+    bump_generation(
+        f'follows:{follow.user_id}',
+        *[f'profile:{username}' for username in usernames]
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_replaced_image(sender, instance, raw=False, update_fields=None,
+                            **kwargs):
+    instance.replaced_image = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is None or 'image' in update_fields:
+        instance.replaced_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('image', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, **kwargs):
+    if getattr(instance, 'replaced_image', None) != instance.image.name:
+        storage.release(instance.replaced_image)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    storage.release(instance.image.name)
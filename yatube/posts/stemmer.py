@@ -0,0 +1,139 @@
+"""Стеммер русского языка по алгоритму Snowball (Russian stemming).
+
+Переложение https://snowballstem.org/algorithms/russian/stemmer.html:
+окончания снимаются только внутри области RV (после первой гласной),
+словообразовательные суффиксы «ост»/«ость» — внутри R2.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE = ('ся', 'сь')
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейш', 'ейше')
+DERIVATIONAL = ('ост', 'ость')
+
+WORD_RE = re.compile(r'\w+')
+
+
+def longest_suffix(word, suffixes):
+    return max(
+        (suffix for suffix in suffixes if word.endswith(suffix)),
+        key=len, default=None,
+    )
+
+
+def remove_ending(rv, groups):
+    """Снимает самое длинное окончание групп ``(после а/я, обычные)``.
+
+    Окончание первой группы снимается, только если перед ним «а» или
+    «я». Возвращает новую область или None, если окончание не снято.
+    """
+    first, second = groups
+    suffix = longest_suffix(rv, first + second)
+    if suffix is None:
+        return None
+    if suffix in first and not rv[:-len(suffix)].endswith(('а', 'я')):
+        return None
+    return rv[:-len(suffix)]
+
+
+def remove_adjectival(rv):
+    suffix = longest_suffix(rv, ADJECTIVE)
+    if suffix is None:
+        return None
+    rv = rv[:-len(suffix)]
+    participle = remove_ending(rv, PARTICIPLE)
+    return rv if participle is None else participle
+
+
+def remove_verb(rv):
+    return remove_ending(rv, VERB)
+
+
+def remove_noun(rv):
+    suffix = longest_suffix(rv, NOUN)
+    return None if suffix is None else rv[:-len(suffix)]
+
+
+def region_after(word, start):
+    """Начало области за первой парой «гласная, согласная» после start."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def remove_inflection(rv):
+    """Шаг 1: деепричастие, иначе возвратная частица и окончание
+    прилагательного, глагола или существительного."""
+    result = remove_ending(rv, PERFECTIVE_GERUND)
+    if result is not None:
+        return result
+    reflexive = longest_suffix(rv, REFLEXIVE)
+    if reflexive is not None:
+        rv = rv[:-len(reflexive)]
+    for remove in (remove_adjectival, remove_verb, remove_noun):
+        result = remove(rv)
+        if result is not None:
+            return result
+    return rv
+
+
+def tidy_up(rv):
+    """Шаг 4: «нн», превосходная степень и мягкий знак."""
+    if rv.endswith('нн'):
+        return rv[:-1]
+    suffix = longest_suffix(rv, SUPERLATIVE)
+    if suffix is not None:
+        rv = rv[:-len(suffix)]
+        return rv[:-1] if rv.endswith('нн') else rv
+    return rv[:-1] if rv.endswith('ь') else rv
+
+
+def stem(word):
+    """Основа слова; слово должно быть в нижнем регистре."""
+    word = word.replace('ё', 'е')
+    rv_start = next(
+        (i + 1 for i, letter in enumerate(word) if letter in VOWELS),
+        len(word),
+    )
+    r2_start = region_after(word, region_after(word, 0))
+    prefix, rv = word[:rv_start], word[rv_start:]
+    rv = remove_inflection(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    # Шаг 3: словообразовательный суффикс, если он целиком в R2.
+    suffix = longest_suffix(rv, DERIVATIONAL)
+    if suffix is not None and len(prefix + rv) - len(suffix) >= r2_start:
+        rv = rv[:-len(suffix)]
+    return prefix + tidy_up(rv)
+
+
+def tokenize(text):
+    """Основы всех слов текста по порядку."""
+    return [stem(word) for word in WORD_RE.findall(text.lower())]
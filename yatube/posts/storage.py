@@ -0,0 +1,144 @@
+"""Хранилище картинок постов, адресуемое по содержимому.
+
+Файл называется по SHA-256 своего содержимого:
+``posts/<первые два символа>/<sha256>.<расширение>``. Одинаковые
+загрузки сохраняются одним файлом, а значит, делят и один набор
+вариантов (posts.thumbnails). Содержимое под таким именем никогда не
+меняется, поэтому core.media отдаёт его как immutable.
+
+Хеш считается на лету: HashingUploadHandler (posts.uploads) обновляет
+его по мере записи загрузки во временный файл, а process_image — по
+байтам обработанной копии. Для файлов без ``sha256`` его считает само
+хранилище, проходя по ним кусками. Файл удаляет только
+``release`` (и команда delete_unused_images) — когда на него не
+ссылается ни один пост.
+
+Пост с новой загрузкой уже существующего содержимого фиксируется позже,
+чем ``_save`` нашёл файл. Чтобы файл не удалили в этом окне, ``_save``
+обновляет время изменения найденного файла, а удаление пропускает
+файлы, тронутые за последние IMAGE_DELETE_GRACE секунд. Проверка и
+обновление идут под блокировкой каталога файла, общей для процессов.
+"""
+import fcntl
+import hashlib
+import os
+import posixpath
+import re
+import time
+from contextlib import contextmanager
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+
+CONTENT_NAME_RE = re.compile(r'(?:^|/)[0-9a-f]{2}/([0-9a-f]{64})\.\w+$')
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def name_digest(name):
+    """SHA-256 из имени файла хранилища или None для старых имён."""
+    match = CONTENT_NAME_RE.search(name)
+    return match.group(1) if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    @contextmanager
+    def lock(self, name):
+        """Межпроцессная блокировка каталога файла ``name``."""
+        directory = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def touch(self, name):
+        """Продлевает файлу отсрочку удаления; False, если файла нет."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def recently_touched(self, name):
+        age = time.time() - os.path.getmtime(self.path(name))
+        return age < settings.IMAGE_DELETE_GRACE
+
+    def get_available_name(self, name, max_length=None):
+        # Занятое имя — тот же файл: искать свободное не нужно.
+        return name
+
+    def content_name(self, name, digest):
+        directory = posixpath.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def _save(self, name, content):
+        digest = getattr(content, 'sha256', None) or content_digest(content)
+        name = self.content_name(name, digest)
+        with self.lock(name):
+            if self.touch(name):
+                return name
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        # Пишем под временным именем и атомарно переименовываем:
+        # параллельная загрузка того же файла просто заменит его копией.
+        temporary = os.path.join(directory, f'.{uuid4().hex}.tmp')
+        try:
+            if hasattr(content, 'temporary_file_path'):
+                file_move_safe(content.temporary_file_path(), temporary)
+            else:
+                with open(temporary, 'wb') as target:
+                    for chunk in content.chunks():
+                        target.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, full_path)
+        except BaseException:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        return name
+
+
+image_storage = ContentAddressedStorage()
+
+
+def delete_unused(name):
+    """Удаляет файл, если на него нет постов и его давно не загружали.
+
+    Возвращает True, если файл удалён.
+    """
+    from . import thumbnails
+    from .models import Post
+
+    with image_storage.lock(name):
+        if (not image_storage.exists(name)
+                or image_storage.recently_touched(name)
+                or Post.objects.filter(image=name).exists()):
+            return False
+        thumbnails.delete_variants(name)
+        image_storage.delete(name)
+    return True
+
+
+def release(name):
+    """Удаляет файл после фиксации, если он больше никому не нужен.
+
+    Счётчиком ссылок служат сами посты: проверяется, остался ли пост с
+    этим именем, по индексу на ``Post.image``. Файлы со старыми именами
+    (до адресации по содержимому) не трогаются. Файл, загруженный
+    недавно, остаётся до запуска delete_unused_images.
+    """
+    if name and name_digest(name):
+        transaction.on_commit(lambda: delete_unused(name))
@@ -0,0 +1,19 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/post_image.html')
+def post_picture(post, sizes):
+    """Картинка поста в <picture> с WebP и JPEG или заглушка."""
+    try:
+        variants = post.prefetched_image
+    except AttributeError:
+        variants = thumbnails.post_image(post.image)
+    return {
+        'image': post.image,
+        'variants': variants,
+        'sizes': sizes,
+    }
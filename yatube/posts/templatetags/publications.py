@@ -0,0 +1,20 @@
+from django import template
+
+from posts import fragments
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_publications(context, posts):
+    """Находит закешированные карточки постов страницы разом."""
+    fragments.prefetch_publications(posts, not context.get('group'))
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def publication(context, post):
+    """Карточка поста из кеша; на странице группы — без ссылки на неё."""
+    return fragments.publication_html(
+        post, context['request'], not context.get('group')
+    )
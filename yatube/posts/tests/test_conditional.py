@@ -0,0 +1,97 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        self.urls = (
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def test_pages_send_validators(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+                self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_matching_etag_gives_304_without_rendering(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(1):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.content, b'')
+                self.assertEqual(response.templates, [])
+
+    def test_if_modified_since_is_ignored(self):
+        newest = Post.objects.create(
+            author=self.author, group=self.group, text='Свежий пост'
+        )
+        since = http_date(time.time() + 60)
+        urls = self.urls[:2]
+        for url in urls:
+            self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        newest.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotContains(response, 'Свежий пост')
+
+    def test_changes_invalidate_validators(self):
+        etags = [self.client.get(url)['ETag'] for url in self.urls]
+        Comment.objects.create(post=self.post, author=self.reader, text='Да')
+        self.post.text = 'Исправленный пост'
+        self.post.save()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        client = Client()
+        client.force_login(self.reader)
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_missing_objects_are_not_found(self):
+        for url in (
+            reverse('posts:group_list', kwargs={'slug': 'nope'}),
+            reverse('posts:profile', kwargs={'username': 'nobody'}),
+            reverse('posts:post_detail', kwargs={'post_id': 10 ** 6}),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertFalse(response.has_header('ETag'))
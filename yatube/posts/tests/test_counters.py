@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..counters import get_counters
+from ..models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_counters_follow_writes(self):
+        counters = get_counters(self.author)
+        self.assertEqual(counters.posts_count, 1)
+        Post.objects.create(author=self.author, text='Ещё пост')
+        Follow.objects.create(user=self.user, author=self.author)
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        counters.refresh_from_db()
+        self.assertEqual(counters.posts_count, 2)
+        self.assertEqual(counters.followers_count, 1)
+        self.assertEqual(get_counters(self.user).following_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        comment.delete()
+        Follow.objects.all().delete()
+        counters.refresh_from_db()
+        self.post.refresh_from_db()
+        self.assertEqual(counters.followers_count, 0)
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_pages_do_not_count_rows(self):
+        get_counters(self.author)
+        urls = [
+            reverse('posts:profile', kwargs={'username': 'writer'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    self.authorized_client.get(url)
+                self.assertFalse([
+                    query['sql'] for query in queries
+                    if 'COUNT(' in query['sql']
+                ])
+
+    def test_repair_command_fixes_drift(self):
+        get_counters(self.author)
+        UserCounters.objects.filter(user=self.author).update(posts_count=7)
+        Post.objects.filter(pk=self.post.pk).update(comments_count=3)
+        with self.assertRaises(CommandError):
+            call_command('repair_counters', check=True, stdout=StringIO())
+        call_command('repair_counters', stdout=StringIO())
+        self.assertEqual(get_counters(self.author).posts_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        call_command('repair_counters', check=True, stdout=StringIO())
+
+    def test_missing_counters_row_is_not_drift(self):
+        UserCounters.objects.all().delete()
+        out = StringIO()
+        call_command('repair_counters', check=True, stdout=out)
+        self.assertIn('пользователей — 0', out.getvalue())
+        self.assertFalse(UserCounters.objects.exists())
+        out = StringIO()
+        call_command('repair_counters', stdout=out)
+        self.assertIn('пользователей — 0', out.getvalue())
+        self.assertEqual(
+            UserCounters.objects.get(user=self.author).posts_count, 1
+        )
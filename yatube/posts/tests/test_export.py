@@ -0,0 +1,101 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..export import export_chunks
+from ..models import Comment, Group, Post
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост, "{i}"\nв две строки',
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(5)
+        ]
+        Post.objects.create(author=cls.other, text='Чужой пост')
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.other, text='Комментарий'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def read_jsonl(self, chunks):
+        return [json.loads(line)
+                for line in b''.join(chunks).decode().splitlines()]
+
+    def test_keyset_chunks_cover_all_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            records = self.read_jsonl(
+                export_chunks('post', author='author', chunk_size=2)
+            )
+        self.assertEqual([record['id'] for record in records],
+                         [post.pk for post in self.posts])
+        self.assertEqual(len(queries), 3)
+        self.assertEqual(records[1]['group'], 'group')
+        self.assertEqual(records[0]['type'], 'post')
+
+    def test_csv_and_gzip(self):
+        data = gzip.decompress(
+            b''.join(export_chunks('post', 'csv', compress=True,
+                                   group='group'))
+        ).decode()
+        rows = list(csv.DictReader(StringIO(data)))
+        self.assertEqual([int(row['id']) for row in rows],
+                         [self.posts[1].pk, self.posts[3].pk])
+        self.assertEqual(rows[0]['text'], self.posts[1].text)
+
+    def test_view_is_staff_only_and_streams(self):
+        url = reverse('posts:export', kwargs={'kind': 'comment'})
+        client = Client()
+        client.force_login(self.author)
+        self.assertEqual(client.get(url).status_code, 302)
+        client.force_login(self.staff)
+        response = client.get(url, {'gzip': '1'})
+        self.assertTrue(response.streaming)
+        self.assertIn('comments.jsonl.gz', response['Content-Disposition'])
+        records = self.read_jsonl(
+            [gzip.decompress(b''.join(response.streaming_content))]
+        )
+        self.assertEqual(records[0]['post'], self.posts[0].pk)
+        self.assertEqual(
+            client.get(reverse('posts:export', kwargs={'kind': 'user'}))
+            .status_code, 404
+        )
+
+    def test_command_writes_importable_file(self):
+        path = os.path.join(TEMP_DIR, 'posts.jsonl')
+        call_command('export_content', 'post', output=path)
+        with open(path, 'rb') as export:
+            self.assertEqual(len(self.read_jsonl([export.read()])), 6)
+        Post.objects.all().delete()
+        call_command('import_content', path, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 6)
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..fragments import TEMPLATE
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PublicationCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Текст поста'
+        )
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.edit_url = reverse('posts:post_edit', args=[self.post.pk])
+
+    def templates(self, response):
+        return [template.name for template in response.templates]
+
+    def test_fragment_is_shared_between_viewers(self):
+        response = self.reader_client.get(reverse('posts:home'))
+        self.assertIn(TEMPLATE, self.templates(response))
+        self.assertNotContains(response, self.edit_url)
+        response = self.author_client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertNotIn(TEMPLATE, self.templates(response))
+        self.assertContains(response, self.edit_url)
+        self.assertContains(response, 'Лев Толстой')
+
+    def test_fragment_is_shared_between_listings(self):
+        self.client.get(reverse('posts:home'))
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username])
+        )
+        self.assertNotIn(TEMPLATE, self.templates(response))
+        self.assertContains(response, 'Текст поста')
+
+    def test_group_page_hides_group_link(self):
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        self.assertContains(self.client.get(reverse('posts:home')),
+                            f'href="{group_url}"')
+        response = self.client.get(group_url)
+        self.assertNotContains(response, f'href="{group_url}"')
+
+    def test_changes_refresh_fragment(self):
+        self.client.get(reverse('posts:home'))
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.author.first_name = 'Алексей'
+        self.author.save()
+        self.group.slug = 'renamed'
+        self.group.save()
+        response = self.reader_client.get(reverse('posts:home'))
+        self.assertIn(TEMPLATE, self.templates(response))
+        self.assertContains(response, 'Новый текст')
+        self.assertContains(response, 'Алексей Толстой')
+        self.assertContains(response, reverse('posts:group_list',
+                                              args=['renamed']))
+
+    def test_login_keeps_fragment(self):
+        self.client.get(reverse('posts:home'))
+        self.author.save(update_fields=['last_login'])
+        response = self.reader_client.get(reverse('posts:home'))
+        self.assertNotIn(TEMPLATE, self.templates(response))
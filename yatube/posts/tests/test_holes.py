@@ -0,0 +1,134 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template import RequestContext, Template
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from core import holes
+from ..caching import cache_page_by_generation
+from ..models import Comment, Follow, Post
+
+User = get_user_model()
+
+
+class HolesTests(TestCase):
+    def test_deferred_hole_is_filled_later(self):
+        holes.register('echo')(lambda request, *args: '|'.join(args))
+        request = RequestFactory().get('/')
+        with holes.deferred(request):
+            marker = holes.hole(request, 'echo', 'a b', 'c-->', 7)
+        self.assertNotIn('a b', marker)
+        self.assertEqual(holes.fill(request, f'[{marker}]'), '[a b|c-->|7]')
+        self.assertEqual(holes.hole(request, 'echo', 'x', 1), 'x|1')
+
+
+class CachedPageHolesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client(enforce_csrf_checks=True)
+        self.reader_client.force_login(self.reader)
+
+    def test_page_is_shared_but_header_is_personal(self):
+        edit_url = reverse('posts:post_edit', args=[self.post.pk])
+        response = self.reader_client.get(reverse('posts:home'))
+        self.assertTemplateUsed(response, 'posts/index.html')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertNotContains(response, edit_url)
+        response = self.author_client.get(reverse('posts:home'))
+        self.assertTemplateNotUsed(response, 'posts/index.html')
+        self.assertContains(response, 'Пользователь: author')
+        self.assertNotContains(response, 'Пользователь: reader')
+        self.assertContains(response, edit_url)
+        response = self.client.get(reverse('posts:home'))
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, 'Пользователь:')
+
+    def test_comment_form_gets_viewer_csrf_token(self):
+        detail_url = reverse('posts:post_detail', args=[self.post.pk])
+        comment_url = reverse('posts:add_comment', args=[self.post.pk])
+        self.assertNotContains(self.client.get(detail_url), comment_url)
+        response = self.reader_client.get(detail_url)
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+        token = re.search(
+            r'name="csrfmiddlewaretoken" value="([^"]+)"',
+            response.content.decode(),
+        )[1]
+        response = self.reader_client.post(comment_url, {
+            'text': 'Комментарий', 'csrfmiddlewaretoken': token,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Comment.objects.filter(text='Комментарий').exists())
+
+    def test_follow_button_shows_viewer_state(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        profile_url = reverse('posts:profile', args=['author'])
+        self.assertContains(self.reader_client.get(profile_url),
+                            'Отписаться')
+        response = self.author_client.get(profile_url)
+        self.assertTemplateNotUsed(response, 'posts/profile.html')
+        self.assertContains(response, 'Подписаться')
+        self.assertNotContains(response, 'Отписаться')
+
+    def test_author_page_does_not_leak_to_other_user(self):
+        detail_url = reverse('posts:post_detail', args=[self.post.pk])
+        edit_url = reverse('posts:post_edit', args=[self.post.pk])
+        response = self.author_client.get(detail_url)
+        self.assertContains(response, edit_url)
+        author_token = re.search(
+            r'name="csrfmiddlewaretoken" value="([^"]+)"',
+            response.content.decode(),
+        )[1]
+        response = self.reader_client.get(detail_url)
+        self.assertTemplateNotUsed(response, 'posts/post_detail.html')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertNotContains(response, 'Пользователь: author')
+        self.assertNotContains(response, edit_url)
+        self.assertNotContains(response, author_token)
+
+
+class SharedRenderTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.rendered = 0
+
+    def request(self, user):
+        request = self.factory.get('/')
+        request.user = user
+        return request
+
+    def test_user_outside_holes_renders_as_anonymous(self):
+        @cache_page_by_generation(60, 'posts')
+        def view(request):
+            self.rendered += 1
+            return HttpResponse(Template(
+                '{{ user.username }}|{{ user.is_authenticated }}'
+            ).render(RequestContext(request)))
+
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        self.assertEqual(view(self.request(author)).content, b'|False')
+        self.assertEqual(view(self.request(reader)).content, b'|False')
+        self.assertEqual(self.rendered, 1)
+
+    def test_page_with_csrf_token_is_not_stored(self):
+        @cache_page_by_generation(60, 'posts')
+        def view(request):
+            self.rendered += 1
+            return HttpResponse(get_token(request))
+
+        first = self.request(User.objects.create_user(username='author'))
+        response = view(first)
+        self.assertTrue(first.META['CSRF_COOKIE_USED'])
+        second = self.request(User.objects.create_user(username='reader'))
+        self.assertNotEqual(view(second).content, response.content)
+        self.assertEqual(self.rendered, 2)
@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Post
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+class ImportContentTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.existing = User.objects.create_user(username='old_author')
+        Post.objects.create(author=self.existing, text='Старый пост')
+        self.path = os.path.join(TEMP_DIR, f'{self._testMethodName}.jsonl')
+
+    def write(self, records, mode='w'):
+        with open(self.path, mode) as source:
+            for record in records:
+                source.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def run_import(self, path=None, **options):
+        call_command('import_content', path or self.path, stdout=StringIO(),
+                     batch_size=2, **options)
+
+    def test_import_and_resume(self):
+        self.write([
+            {'type': 'post', 'id': 1, 'author': 'writer', 'group': 'news',
+             'text': 'Первый', 'pub_date': '2020-01-02T03:04:05'},
+            {'type': 'post', 'id': 2, 'author': 'writer', 'text': 'Второй'},
+            {'type': 'comment', 'id': 1, 'post': 1, 'author': 'old_author',
+             'text': 'Комментарий'},
+            {'type': 'comment', 'id': 2, 'post': 99, 'author': 'writer',
+             'text': 'К несуществующему посту'},
+            {'type': 'follow', 'user': 'old_author', 'author': 'writer'},
+        ])
+        self.run_import()
+        writer = User.objects.get(username='writer')
+        first = writer.posts.get(text='Первый')
+        self.assertEqual(first.group.slug, 'news')
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertEqual(first.comments_count, 1)
+        self.assertEqual(writer.counters.posts_count, 2)
+        self.assertEqual(writer.counters.followers_count, 1)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(
+            list(self.existing.timeline.values_list('post_id', flat=True)),
+            list(writer.posts.values_list('pk', flat=True))
+        )
+
+        # Повторный запуск продолжает с контрольной точки.
+        self.write([
+            {'type': 'post', 'id': 3, 'author': 'newcomer', 'text': 'Третий'},
+            {'type': 'follow', 'user': 'old_author', 'author': 'writer'},
+        ], mode='a')
+        self.run_import()
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertTrue(User.objects.filter(username='newcomer').exists())
+
+    def test_csv_with_type_option(self):
+        path = os.path.join(TEMP_DIR, 'posts.csv')
+        with open(path, 'w', newline='') as source:
+            source.write('id,author,text\n1,csv_author,"Строка\nс переносом"\n'
+                         '2,csv_author,Вторая\n')
+        self.run_import(path, type='post')
+        self.assertEqual(
+            set(Post.objects.filter(author__username='csv_author')
+                .values_list('text', flat=True)),
+            {'Строка\nс переносом', 'Вторая'}
+        )
+
+    def test_ids_are_assigned_by_database(self):
+        later = Post.objects.create(author=self.existing, text='Позже')
+        Comment.objects.create(post=later, author=self.existing, text='Да')
+        self.write([
+            {'type': 'post', 'id': 'a-1', 'author': 'writer', 'text': 'Пост',
+             'pub_date': '2020-01-02T03:04:05'},
+            {'type': 'comment', 'id': 'c-1', 'post': 'a-1',
+             'author': 'writer', 'text': 'Ответ',
+             'created': '2020-01-03T03:04:05'},
+        ])
+        self.run_import()
+        post = Post.objects.get(text='Пост')
+        self.assertGreater(post.pk, later.pk)
+        self.assertEqual(post.pub_date.year, 2020)
+        comment = post.comments.get()
+        self.assertEqual(comment.created.year, 2020)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertTrue(
+            Comment._meta.get_field('created').auto_now_add
+        )
+
+    def test_comments_from_separate_csv_run(self):
+        posts_path = os.path.join(TEMP_DIR, 'run_posts.csv')
+        with open(posts_path, 'w', newline='') as source:
+            source.write('id,author,text\n10,csv_author,Пост\n'
+                         '11,csv_author,Другой пост\n')
+        comments_path = os.path.join(TEMP_DIR, 'run_comments.csv')
+        with open(comments_path, 'w', newline='') as source:
+            source.write('id,post,author,text\n1,11,reader,Первый\n'
+                         '2,11,reader,Второй\n3,404,reader,Мимо\n')
+        self.run_import(posts_path, type='post')
+        self.run_import(comments_path, type='comment')
+        post = Post.objects.get(text='Другой пост')
+        self.assertEqual(
+            set(post.comments.values_list('text', flat=True)),
+            {'Первый', 'Второй'}
+        )
+        self.assertEqual(Comment.objects.count(), 2)
+
+        self.run_import(posts_path, type='post', restart=True)
+        self.run_import(comments_path, type='comment', restart=True)
+        self.assertEqual(
+            Post.objects.filter(author__username='csv_author').count(), 2
+        )
+        self.assertEqual(Comment.objects.count(), 2)
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..inverted_index import (InvertedIndex, decode_postings,
+                              encode_postings, get_index)
+from ..models import Post
+from ..stemmer import stem
+
+TEMP_INDEX_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+    def test_snowball_stems(self):
+        for word, expected in (
+            ('важнейшие', 'важн'),
+            ('взбесившись', 'взбес'),
+            ('ведомость', 'ведом'),
+            ('красивейший', 'красив'),
+            ('ежики', 'ежик'),
+            ('шёл', 'шел'),
+        ):
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+    def test_postings_round_trip(self):
+        postings = [(1, 1), (5, 3), (300, 1), (70000, 200)]
+        encoded = encode_postings(postings)
+        self.assertEqual(decode_postings(encoded), postings)
+        self.assertLess(len(encoded), 4 * 2 * len(postings))
+
+
+@override_settings(
+    SEARCH_BACKEND='index',
+    SEARCH_INDEX_PATH=os.path.join(TEMP_INDEX_DIR, 'posts.idx'),
+)
+class InvertedIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='indexer')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_INDEX_DIR, ignore_errors=True)
+
+    def setUp(self):
+        get_index().rebuild([])
+
+    def create(self, text):
+        return Post.objects.create(author=self.user, text=text)
+
+    def search(self, query):
+        return [doc_id for doc_id, _ in get_index().search(query)]
+
+    def test_signals_update_index(self):
+        post = self.create('Ёжик шёл в тумане')
+        self.assertEqual(self.search('ежики'), [post.pk])
+        post.text = 'Белка'
+        post.save()
+        self.assertEqual(self.search('ежик'), [])
+        self.assertEqual(self.search('белки'), [post.pk])
+        post.delete()
+        self.assertEqual(self.search('белка'), [])
+
+    def test_and_or_prefix_queries(self):
+        fog = self.create('Туман над рекой')
+        river = self.create('Река и лодка')
+        boat = self.create('Лодочник')
+        self.assertEqual(self.search('туман река'), [fog.pk])
+        self.assertCountEqual(
+            self.search('туман OR лодка'), [fog.pk, river.pk]
+        )
+        self.assertCountEqual(self.search('лодо*'), [river.pk, boat.pk])
+        self.assertEqual(self.search('лодочник AND река'), [])
+
+    def test_tf_idf_ranking(self):
+        once = self.create('Кот спит')
+        twice = self.create('Кот и кот')
+        rare = self.create('Кот и собака')
+        self.create('Собака лает')
+        self.assertEqual(self.search('кот'), [twice.pk, once.pk, rare.pk])
+        self.assertEqual(self.search('кот OR собака')[0], rare.pk)
+
+    @override_settings(SEARCH_INDEX_JOURNAL_LIMIT=1)
+    def test_journal_compaction_keeps_results(self):
+        first = self.create('Зимний лес')
+        generation = get_index().generation
+        second = self.create('Летний лес')
+        first.delete()
+        index = get_index()
+        self.assertGreater(index.generation, generation)
+        self.assertFalse(os.path.exists(index.journal_path(index.generation)))
+        self.assertEqual(self.search('лес'), [second.pk])
+        self.assertEqual(index.doc_count(), 1)
+
+    def test_other_process_sees_updates(self):
+        """Второй экземпляр индекса читает тот же сегмент и журнал."""
+        other = InvertedIndex(settings.SEARCH_INDEX_PATH)
+        post = self.create('Общий индекс')
+        self.assertEqual([pk for pk, _ in other.search('общий')], [post.pk])
+        call_command('rebuild_search_index', stdout=StringIO())
+        post.delete()
+        self.assertEqual(other.search('общий'), [])
+
+    def test_search_view_uses_index(self):
+        posts = [self.create(f'Лунный пост {i}') for i in range(12)]
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'лунный'})
+        seen = list(response.context['posts'])
+        response = self.client.get(
+            url, {'q': 'лунный', 'cursor': response.context['next_cursor']}
+        )
+        seen.extend(response.context['posts'])
+        self.assertCountEqual(seen, posts)
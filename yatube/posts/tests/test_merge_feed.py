@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ..merge_feed import load_recent_posts, post_key
+from ..models import Follow, Post
+
+User = get_user_model()
+
+
+@override_settings(FOLLOW_FEED_ENGINE='merge', RECENT_POSTS_PER_AUTHOR=5)
+class MergeFeedTests(TransactionTestCase):
+    """Списки сбрасываются после фиксации, поэтому транзакции настоящие."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader')
+        self.authors = [
+            User.objects.create_user(username=f'writer_{i}')
+            for i in range(3)
+        ]
+        for author in self.authors:
+            Follow.objects.create(user=self.user, author=author)
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_posts(self, count):
+        return [
+            Post.objects.create(
+                author=self.authors[i % len(self.authors)],
+                text=f'Пост {i}',
+            )
+            for i in range(count)
+        ]
+
+    def read_feed(self):
+        url = reverse('posts:follow_index')
+        page_obj = self.authorized_client.get(url).context['page_obj']
+        seen = list(page_obj)
+        while page_obj.has_next():
+            page_obj = self.authorized_client.get(
+                url, {'cursor': page_obj.next_cursor}
+            ).context['page_obj']
+            seen.extend(page_obj)
+        return seen
+
+    def test_feed_pages_match_orm_query(self):
+        """Слияние и запрос к базе дают одну и ту же ленту."""
+        self.create_posts(25)
+        expected = list(
+            Post.objects.filter(author__following__user=self.user)
+            .order_by('-pub_date', '-pk')
+        )
+        self.assertEqual(self.read_feed(), expected)
+
+    def test_new_and_deleted_posts_update_lists(self):
+        posts = self.create_posts(3)
+        load_recent_posts([self.authors[0].pk])
+        new_post = Post.objects.create(author=self.authors[0], text='Новый')
+        values = load_recent_posts([self.authors[0].pk])[self.authors[0].pk]
+        self.assertEqual(
+            (values[0], values[1]),
+            post_key(new_post.pub_date, new_post.pk)
+        )
+        posts[0].delete()
+        self.assertNotIn(posts[0], self.read_feed())
+
+    def test_list_is_rebuilt_after_commit(self):
+        author = self.authors[0]
+        self.create_posts(1)
+        load_recent_posts([author.pk])
+        with transaction.atomic():
+            first = Post.objects.create(author=author, text='Первый')
+            second = Post.objects.create(author=author, text='Второй')
+            # Прочитанный до фиксации список не переживёт её.
+            load_recent_posts([author.pk])
+        values = load_recent_posts([author.pk])[author.pk]
+        self.assertEqual(
+            list(values[:4]),
+            [*post_key(second.pub_date, second.pk),
+             *post_key(first.pub_date, first.pk)]
+        )
+
+    def test_profile_uses_author_list(self):
+        posts = self.create_posts(3)
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'writer_0'})
+        )
+        self.assertEqual(list(response.context['page_obj']), [posts[0]])
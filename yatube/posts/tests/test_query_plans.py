@@ -0,0 +1,117 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import QueryPlanMixin, plan_problems
+
+from ..models import Comment, Follow, Group, Post
+from ..utils import CURSOR_NEXT, encode_cursor
+
+User = get_user_model()
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    """Ни один запрос страниц не читает таблицу целиком и не сортирует."""
+
+    allowed_plans = (
+        # Выдача поиска упорядочена по bm25: релевантность считается по
+        # найденным строкам, индекса по ней не бывает. Совпадения
+        # комментариев собираются по посту так же.
+        ('FROM posts_search', 'USE TEMP B-TREE FOR ORDER BY'),
+        ('FROM posts_search', 'USE TEMP B-TREE FOR GROUP BY'),
+        # Форма поста предлагает выбрать любую группу.
+        ('FROM "posts_group"', 'SCAN posts_group'),
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост номер {i}',
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(25)
+        ]
+        for post in cls.posts[:3]:
+            Comment.objects.create(post=post, author=cls.reader,
+                                   text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def cursor(self):
+        post = self.posts[10]
+        return '?cursor=' + encode_cursor(CURSOR_NEXT, post.pub_date, post.pk)
+
+    def public_urls(self):
+        cursor = self.cursor()
+        return [
+            reverse('posts:home'),
+            reverse('posts:home') + cursor,
+            reverse('posts:home') + '?page=2',
+            reverse('posts:group_list', args=['group']),
+            reverse('posts:group_list', args=['group']) + cursor,
+            reverse('posts:profile', args=['author']),
+            reverse('posts:profile', args=['author']) + cursor,
+            reverse('posts:post_detail', args=[self.posts[0].pk]),
+            reverse('posts:search') + '?q=номер',
+        ]
+
+    def check_urls(self, urls, client=None):
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertQueryPlansUseIndexes(url, client)
+
+    def check_user_pages(self, client):
+        self.check_urls(self.public_urls() + [
+            reverse('posts:follow_index'),
+            reverse('posts:follow_index') + self.cursor(),
+            reverse('posts:post_edit', args=[self.posts[0].pk]),
+            reverse('posts:create_post'),
+        ], client)
+
+    def test_full_scan_and_sort_are_detected(self):
+        self.assertEqual(
+            plan_problems('SELECT id FROM posts_post WHERE text = 1 '
+                          'ORDER BY comments_count'),
+            ['SCAN posts_post', 'USE TEMP B-TREE FOR ORDER BY'],
+        )
+
+    def test_cursor_urls_open_keyset_pages(self):
+        for url in self.public_urls():
+            if 'cursor=' not in url:
+                continue
+            with self.subTest(url=url):
+                cache.clear()
+                page = self.client.get(url).context['page_obj']
+                self.assertTrue(page.paginator.is_cursor)
+                self.assertLess(page[0].pk, self.posts[10].pk)
+
+    def test_anonymous_pages(self):
+        self.check_urls(self.public_urls())
+
+    def test_pages_of_reader(self):
+        self.check_user_pages(self.reader_client)
+
+    def test_pages_of_author(self):
+        author_client = Client()
+        author_client.force_login(self.author)
+        self.check_user_pages(author_client)
+
+    @override_settings(PAGINATION_MODE='pages')
+    def test_numbered_pages(self):
+        self.check_user_pages(self.reader_client)
+
+    @override_settings(FOLLOW_FEED_ENGINE='merge')
+    def test_merge_feed(self):
+        self.check_user_pages(self.reader_client)
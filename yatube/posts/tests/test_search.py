@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post
+from ..search import match_expression, search_post_ids
+from ..utils import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='searcher')
+
+    def setUp(self):
+        self.hedgehog = Post.objects.create(
+            author=self.user, text='Ёжик шёл в тумане к медвежонку'
+        )
+        self.other = Post.objects.create(
+            author=self.user, text='Про погоду и туманы над рекой'
+        )
+
+    def search(self, query):
+        return [pk for pk, _ in search_post_ids(query)]
+
+    def test_russian_word_forms_and_yo(self):
+        self.assertEqual(self.search('ежики'), [self.hedgehog.pk])
+        self.assertEqual(self.search('ШЕЛ'), [self.hedgehog.pk])
+        self.assertCountEqual(
+            self.search('туман'), [self.hedgehog.pk, self.other.pk]
+        )
+        self.assertEqual(self.search('туман реки'), [self.other.pk])
+
+    def test_user_input_is_not_fts_syntax(self):
+        self.assertEqual(match_expression('"ежик" OR NEAR(*'),
+                         '"ежик"* "or"* "near"*')
+        self.assertEqual(self.search('* " -'), [])
+
+    def test_index_follows_posts_and_comments(self):
+        self.hedgehog.text = 'Белка'
+        self.hedgehog.save()
+        self.assertEqual(self.search('ежик'), [])
+        comment = Comment.objects.create(
+            post=self.other, author=self.user, text='Красивая белочка'
+        )
+        self.assertEqual(self.search('белка'), [self.hedgehog.pk])
+        self.assertEqual(self.search('белочка'), [self.other.pk])
+        comment.delete()
+        self.assertEqual(self.search('белочка'), [])
+        self.hedgehog.delete()
+        self.assertEqual(self.search('белка'), [])
+
+    def test_comment_write_touches_one_index_row(self):
+        for i in range(3):
+            Comment.objects.create(
+                post=self.other, author=self.user, text=f'Ответ {i}'
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM posts_comment_search WHERE post_id = %s',
+                [self.other.pk],
+            )
+            self.assertEqual(cursor.fetchone()[0], 3)
+
+    def test_post_text_ranks_above_comments(self):
+        Comment.objects.create(
+            post=self.hedgehog, author=self.user, text='Погода чудесная'
+        )
+        self.assertEqual(
+            self.search('погода'), [self.other.pk, self.hedgehog.pk]
+        )
+
+    def test_search_view_pages_with_cursor(self):
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Лунный пост {i}')
+            for i in range(POSTS_PER_PAGE + 2)
+        )
+        url = reverse('posts:search')
+        response = self.client.get(url, {'q': 'лунный'})
+        first = response.context['posts']
+        self.assertEqual(len(first), POSTS_PER_PAGE)
+        response = self.client.get(
+            url, {'q': 'лунный', 'cursor': response.context['next_cursor']}
+        )
+        second = response.context['posts']
+        self.assertEqual(len(second), 2)
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertFalse(set(first) & set(second))
+
+    def test_rebuild_command(self):
+        Comment.objects.create(
+            post=self.hedgehog, author=self.user, text='Белочка'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM posts_search')
+            cursor.execute('DELETE FROM posts_comment_search')
+        self.assertEqual(self.search('туман'), [])
+        self.assertEqual(self.search('белочка'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search('туман')), 2)
+        self.assertEqual(self.search('белочка'), [self.hedgehog.pk])
+
+
+class SchemaEditor:
+    """Схема базы без SQLite: миграции не должны выполнять SQL."""
+
+    connection = SimpleNamespace(vendor='postgresql')
+
+    def execute(self, sql):
+        raise AssertionError(sql)
+
+
+class FallbackTests(SimpleTestCase):
+    def test_migrations_skip_fts5_on_other_backends(self):
+        editor = SchemaEditor()
+        migration = import_module('posts.migrations.0011_post_search')
+        migration.create_search(None, editor)
+        migration.drop_search(None, editor)
+        self.assertFalse(migration.fts5_available(editor.connection))
+
+
+class NoFts5Tests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        index_settings = override_settings(
+            SEARCH_INDEX_PATH=os.path.join(directory, 'posts.idx')
+        )
+        index_settings.enable()
+        self.addCleanup(index_settings.disable)
+        migration = import_module('posts.migrations.0015_comment_search')
+        with connection.cursor() as cursor:
+            for sql in migration.DROP_SQL:
+                cursor.execute(sql)
+        search._has_search_table.cache_clear()
+        self.addCleanup(search._has_search_table.cache_clear)
+
+    def test_search_uses_inverted_index_without_table(self):
+        self.assertEqual(search.backend(), 'index')
+        search.rebuild_index()
+        user = User.objects.create_user(username='searcher')
+        post = Post.objects.create(author=user, text='Ёжик в тумане')
+        self.assertEqual([pk for pk, _ in search_post_ids('ежики')],
+                         [post.pk])
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from ..models import Post
+from ..storage import delete_unused, image_storage, name_digest
+from ..uploads import HashingUploadHandler
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+DATA = b'GIF89a' + bytes(range(256)) * 10
+DIGEST = hashlib.sha256(DATA).hexdigest()
+
+User = get_user_model()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_post(self, name='cat.GIF'):
+        return Post.objects.create(
+            author=self.user, text='Кот', image=ContentFile(DATA, name=name)
+        )
+
+    def test_same_content_shares_one_file(self):
+        first, second = self.create_post(), self.create_post('other.gif')
+        name = f'posts/{DIGEST[:2]}/{DIGEST}.gif'
+        self.assertEqual(first.image.name, name)
+        self.assertEqual(second.image.name, name)
+        self.assertEqual(name_digest(name), DIGEST)
+        self.assertCountEqual(
+            os.listdir(os.path.dirname(image_storage.path(name))),
+            [f'{DIGEST}.gif', '.lock'],
+        )
+
+    def test_upload_hash_is_computed_while_receiving(self):
+        handler = HashingUploadHandler()
+        handler.new_file('image', 'cat.gif', 'image/gif', len(DATA))
+        for start in range(0, len(DATA), 1000):
+            handler.receive_data_chunk(DATA[start:start + 1000], start)
+        upload = handler.file_complete(len(DATA))
+        self.assertEqual(upload.sha256, DIGEST)
+        # Готовый хеш хранилище не пересчитывает.
+        upload.sha256 = 'f' * 64
+        self.assertEqual(image_storage.save('posts/cat.gif', upload),
+                         f'posts/ff/{"f" * 64}.gif')
+
+    @override_settings(IMAGE_DELETE_GRACE=0)
+    def test_file_is_deleted_with_its_last_post(self):
+        first, second = self.create_post(), self.create_post()
+        name = first.image.name
+        first.delete()
+        delete_unused(name)
+        self.assertTrue(image_storage.exists(name))
+        second.delete()
+        delete_unused(name)
+        self.assertFalse(image_storage.exists(name))
+
+    def age(self, name, seconds):
+        path = image_storage.path(name)
+        mtime = os.path.getmtime(path) - seconds
+        os.utime(path, (mtime, mtime))
+
+    def test_reupload_protects_file_from_deletion(self):
+        post = self.create_post()
+        name = post.image.name
+        post.delete()
+        self.age(name, 2 * settings.IMAGE_DELETE_GRACE)
+        # Загрузка того же содержимого нашла файл, а её пост ещё не
+        # зафиксирован: удаление должно пропустить файл.
+        self.assertEqual(image_storage.save('posts/again.gif',
+                                            ContentFile(DATA)), name)
+        self.assertFalse(delete_unused(name))
+        self.assertTrue(image_storage.exists(name))
+        self.age(name, 2 * settings.IMAGE_DELETE_GRACE)
+        self.assertTrue(delete_unused(name))
+        self.assertFalse(image_storage.exists(name))
+
+    def test_command_deletes_old_unreferenced_files(self):
+        kept = self.create_post().image.name
+        unused = image_storage.save('posts/unused.gif',
+                                    ContentFile(b'GIF89a unused'))
+        fresh = image_storage.save('posts/fresh.gif',
+                                   ContentFile(b'GIF89a fresh'))
+        for name in (kept, unused):
+            self.age(name, 2 * settings.IMAGE_DELETE_GRACE)
+        out = StringIO()
+        call_command('delete_unused_images', stdout=out)
+        self.assertIn('Удалено файлов: 1', out.getvalue())
+        self.assertTrue(image_storage.exists(kept))
+        self.assertFalse(image_storage.exists(unused))
+        self.assertTrue(image_storage.exists(fresh))
+
+    def test_replaced_image_is_remembered(self):
+        post = self.create_post()
+        old_name = post.image.name
+        post.image = ContentFile(b'GIF89a new', name='new.gif')
+        post.save()
+        self.assertEqual(post.replaced_image, old_name)
+        self.assertNotEqual(post.image.name, old_name)
+
+    def test_content_hashed_media_is_immutable(self):
+        post = self.create_post()
+        response = self.client.get(post.image.url)
+        response.close()
+        self.assertIn('immutable', response['Cache-Control'])
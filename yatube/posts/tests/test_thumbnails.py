@@ -0,0 +1,123 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+from ..thumbnails import find_variants, generate_variants
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def test_page_shows_placeholder_until_thumbnail_is_ready(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.assertContains(self.client.get(url), 'thumbnail-placeholder')
+        variants = generate_variants(self.post.image.name)
+        self.assertEqual((variants.width, variants.height), (320, 113))
+        response = self.client.get(url)
+        self.assertNotContains(response, 'thumbnail-placeholder')
+        self.assertContains(response, variants.url)
+        self.assertContains(response, variants.webp_srcset)
+
+    def test_variants_are_content_addressed(self):
+        """Одинаковые картинки делят файлы, лишних ширин не создаётся."""
+        big = BytesIO()
+        Image.new('RGB', (1000, 400), 'red').save(big, 'PNG')
+        names = [
+            Post.objects.create(
+                author=self.user,
+                text='Копия',
+                image=SimpleUploadedFile(
+                    'big.png', big.getvalue(), 'image/png'
+                ),
+            ).image.name
+            for _ in range(2)
+        ]
+        self.assertEqual(names[0], names[1])
+        first, second = map(generate_variants, names)
+        self.assertEqual(first.variants, second.variants)
+        self.assertEqual(
+            sorted({(v['width'], v['format']) for v in first.variants}),
+            [(320, 'JPEG'), (320, 'WEBP'), (640, 'JPEG'), (640, 'WEBP'),
+             (960, 'JPEG'), (960, 'WEBP')]
+        )
+        self.assertEqual((first.width, first.height), (960, 339))
+        self.assertTrue(first.url.endswith('_960x339.jpg'))
+
+    def test_page_resolves_images_with_one_lookup(self):
+        """Картинки страницы ищутся одним get_many и одним запросом."""
+        posts = [self.post] + [
+            Post.objects.create(
+                author=self.user,
+                text=f'Ещё пост {i}',
+                image=SimpleUploadedFile(
+                    f'small_{i}.gif', SMALL_GIF, 'image/gif'
+                ),
+            )
+            for i in range(3)
+        ]
+        for post in posts:
+            generate_variants(post.image.name)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:home'))
+        kv_queries = [query for query in queries
+                      if 'thumbnail_kvstore' in query['sql']]
+        self.assertEqual(len(kv_queries), 1)
+        self.assertNotContains(response, 'thumbnail-placeholder')
+        # Найденное в базе вернулось в кеш одним set_many.
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:home'), {'page': 1})
+        self.assertFalse(any('thumbnail_kvstore' in query['sql']
+                             for query in queries))
+
+    @override_settings(THUMBNAIL_BACKGROUND=False)
+    def test_without_background_pool_thumbnail_is_rendered_inline(self):
+        response = self.client.get(reverse('posts:home'))
+        self.assertNotContains(response, 'thumbnail-placeholder')
+        self.assertIsNotNone(find_variants(self.post.image.name))
+
+    def test_pregenerate_command(self):
+        call_command('pregenerate_thumbnails', workers=1, stdout=StringIO())
+        self.assertIsNotNone(find_variants(self.post.image.name))
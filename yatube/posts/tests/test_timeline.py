@@ -0,0 +1,110 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry
+from ..timeline import fan_out_post
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.stranger = User.objects.create_user(username='stranger')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def timeline_post_ids(self):
+        return list(
+            TimelineEntry.objects.filter(user=self.user)
+            .values_list('post_id', flat=True)
+        )
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        Post.objects.create(author=self.stranger, text='Чужой пост')
+        self.assertEqual(self.timeline_post_ids(), [post.pk])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.timeline_post_ids(), [post.pk])
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertEqual(self.timeline_post_ids(), [])
+
+    def test_deleted_post_leaves_timeline(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        post.delete()
+        self.assertEqual(self.timeline_post_ids(), [])
+
+    @override_settings(TIMELINE_MAX_LENGTH=3, TIMELINE_TRIM_SLACK=0)
+    def test_timeline_is_capped(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(5)
+        ]
+        self.assertEqual(
+            self.timeline_post_ids(),
+            [post.pk for post in reversed(posts[2:])]
+        )
+
+    @override_settings(TIMELINE_MAX_LENGTH=2, TIMELINE_TRIM_SLACK=2)
+    def test_timeline_is_trimmed_once_over_slack(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(4)
+        ]
+        self.assertEqual(
+            self.timeline_post_ids(), [post.pk for post in reversed(posts)]
+        )
+        post = Post.objects.create(author=self.author, text='Пост 4')
+        self.assertEqual(self.timeline_post_ids(), [post.pk, posts[3].pk])
+
+    @override_settings(TIMELINE_MAX_LENGTH=2, TIMELINE_TRIM_SLACK=0)
+    def test_timelines_of_all_followers_are_trimmed_at_once(self):
+        readers = [User.objects.create_user(username=f'reader{i}')
+                   for i in range(5)]
+        for reader in readers:
+            Follow.objects.create(user=reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        for reader in readers:
+            self.assertEqual(
+                list(reader.timeline.values_list('post_id', flat=True)),
+                [posts[2].pk, posts[1].pk]
+            )
+        post = Post(author=self.author, text='Ещё пост')
+        post.save()
+        with self.assertNumQueries(3):
+            fan_out_post(post)
+
+    def test_backfill_command_rebuilds_timelines(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        TimelineEntry.objects.all().delete()
+        call_command('backfill_timelines', stdout=StringIO())
+        self.assertEqual(self.timeline_post_ids(), [post.pk])
+
+    def test_follow_index_reads_timeline(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        TimelineEntry.objects.all().delete()
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [])
@@ -0,0 +1,202 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+from ..uploads import process_image
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+# ru_maxrss наследуется от родителя, поэтому пик меряется по VmHWM,
+# сброшенному через clear_refs перед обработкой.
+RSS_SCRIPT = '''
+import os, sys
+sys.path.insert(0, os.getcwd())
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+import django
+django.setup()
+from django.core.files import File
+from posts.uploads import process_image
+
+
+def memory(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field):
+                return int(line.split()[1])
+
+
+with open(sys.argv[1], 'rb') as source:
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    before = memory('VmRSS')
+    result = process_image(File(source, name='big.jpg'))
+    peak = memory('VmHWM')
+print(peak - before, result.size)
+'''
+
+
+def image_file(name, size, fmt='JPEG', orientation=None, mode='RGB'):
+    buffer = BytesIO()
+    options = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[0x0112] = orientation
+        options['exif'] = exif.tobytes()
+    Image.new(mode, size, 'red').save(buffer, fmt, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def animation_file(name, size, fmt, frames=3):
+    buffer = BytesIO()
+    exif = Image.Exif()
+    exif[0x8825] = {1: 'N', 2: (55.0, 45.0, 0.0)}  # GPSInfo
+    images = [Image.new('RGBA', size, color)
+              for color in ('red', 'green', 'blue', 'white')[:frames]]
+    images[0].save(buffer, fmt, save_all=True, append_images=images[1:],
+                   duration=50, exif=exif.tobytes())
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def opened(result):
+    return Image.open(BytesIO(result.read()))
+
+
+class ProcessImageTests(SimpleTestCase):
+    @override_settings(IMAGE_MAX_SIZE=500)
+    def test_oversize_original_is_downscaled(self):
+        for fmt, name in (('JPEG', 'big.jpg'), ('PNG', 'big.png')):
+            with self.subTest(fmt=fmt):
+                result = process_image(image_file(name, (3000, 1000), fmt))
+                self.assertEqual(result.name, name)
+                image = opened(result)
+                self.assertEqual(image.format, fmt)
+                self.assertEqual(image.size, (500, 167))
+
+    def test_result_carries_digest_of_processed_bytes(self):
+        result = process_image(image_file('photo.jpg', (40, 20)))
+        self.assertEqual(
+            result.sha256, hashlib.sha256(result.read()).hexdigest()
+        )
+
+    def test_orientation_is_applied_and_exif_stripped(self):
+        result = process_image(
+            image_file('photo.jpg', (40, 20), orientation=6)
+        )
+        image = opened(result)
+        self.assertEqual(image.size, (20, 40))
+        self.assertNotIn('exif', image.info)
+
+    def test_small_images_keep_format_and_name(self):
+        result = process_image(
+            image_file('small.gif', (2, 1), 'GIF', mode='P')
+        )
+        self.assertEqual(result.name, 'small.gif')
+        self.assertEqual(opened(result).format, 'GIF')
+
+    @override_settings(IMAGE_MAX_SIZE=100)
+    def test_animation_is_downscaled_without_metadata(self):
+        for fmt, name in (('WEBP', 'moving.webp'), ('PNG', 'moving.png')):
+            with self.subTest(fmt=fmt):
+                upload = animation_file(name, (400, 200), fmt)
+                self.assertIn('exif', opened(upload).info)
+                result = process_image(upload)
+                self.assertEqual(result.name, name)
+                image = opened(result)
+                self.assertEqual(image.format, fmt)
+                self.assertEqual(image.size, (100, 50))
+                self.assertEqual(image.n_frames, 3)
+                self.assertNotIn('exif', image.info)
+                self.assertFalse(image.getexif())
+
+    @override_settings(IMAGE_MAX_DECODED_PIXELS=30_000, IMAGE_MAX_SIZE=150)
+    def test_long_animation_is_rejected(self):
+        # Кадр 200×100 декодируется, а уменьшенные 150×75 копятся:
+        # два кадра укладываются в предел, четыре — нет.
+        result = process_image(
+            animation_file('short.gif', (200, 100), 'GIF', 2)
+        )
+        self.assertEqual(opened(result).n_frames, 2)
+        with self.assertRaises(ValidationError):
+            process_image(animation_file('long.gif', (200, 100), 'GIF', 4))
+
+    @override_settings(IMAGE_MAX_PIXELS=10_000)
+    def test_decompression_bomb_is_rejected(self):
+        with self.assertRaises(ValidationError):
+            process_image(image_file('bomb.png', (101, 100), 'PNG'))
+
+    @override_settings(IMAGE_MAX_DECODED_PIXELS=10_000, IMAGE_MAX_SIZE=50)
+    def test_decoding_is_bounded(self):
+        # JPEG декодируется уменьшенным в 8 раз и проходит предел,
+        # а PNG того же размера пришлось бы декодировать целиком.
+        result = process_image(image_file('wide.jpg', (400, 200)))
+        self.assertEqual(opened(result).size, (50, 25))
+        with self.assertRaises(ValidationError):
+            process_image(image_file('wide.png', (400, 200), 'PNG'))
+
+    def test_peak_rss_is_capped(self):
+        if not os.path.exists('/proc/self/clear_refs'):
+            self.skipTest('Пик памяти меряется через /proc (Linux)')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'big.jpg')
+        size = (8000, 6000)
+        Image.new('RGB', size, 'red').save(path, 'JPEG')
+        output = subprocess.run(
+            [sys.executable, '-c', RSS_SCRIPT, path],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True,
+        ).stdout
+        peak_kib, result_size = map(int, output.split())
+        full_decode_kib = size[0] * size[1] * 3 // 1024
+        # Полное декодирование 48 Мпикс заняло бы больше 140 МиБ.
+        self.assertLess(peak_kib, 64 * 1024)
+        self.assertLess(peak_kib, full_decode_kib // 2)
+        self.assertGreater(result_size, 0)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadFormTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='author')
+        self.client.force_login(self.user)
+
+    @override_settings(IMAGE_MAX_SIZE=100)
+    def test_uploaded_image_is_processed(self):
+        self.client.post(reverse('posts:create_post'), {
+            'text': 'Пост с фото',
+            'image': image_file('photo.jpg', (400, 300), orientation=8),
+        })
+        post = Post.objects.get(text='Пост с фото')
+        self.assertRegex(post.image.name,
+                         r'^posts/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual((post.image.width, post.image.height), (75, 100))
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_bomb_is_a_form_error(self):
+        response = self.client.post(reverse('posts:create_post'), {
+            'text': 'Бомба',
+            'image': image_file('bomb.png', (20, 20), 'PNG'),
+        })
+        self.assertFormError(response, 'form', 'image',
+                             'Картинка слишком большая.')
+        self.assertFalse(Post.objects.filter(text='Бомба').exists())
@@ -7,9 +7,12 @@ from django.urls import reverse
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from posts.models import Post, Group
+from posts.models import Comment, Post, Group
 from posts.forms import PostForm, CommentForm
+from posts.utils import CachedCountPaginator
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -176,13 +179,31 @@ class PostsPagesTests(TestCase):
                             author=self.user,
                             group=self.group)
         response = self.guest_client.get(reverse('posts:home'))
+        Post.objects.filter(pk=self.post.pk).update(text='Изменённый текст')
+        response_cache = self.guest_client.get(reverse('posts:home'))
         last_object = Post.objects.latest('id')
         last_object.delete()
-        response_cache = self.guest_client.get(reverse('posts:home'))
-        cache.clear()
-        response_no_cache = self.guest_client.get(reverse('posts:home'))
+        response_after_delete = self.guest_client.get(reverse('posts:home'))
         self.assertEqual(response.content, response_cache.content)
-        self.assertNotEqual(response.content, response_no_cache.content)
+        self.assertNotEqual(response.content, response_after_delete.content)
+
+    def test_comment_invalidates_only_its_post_page(self):
+        """Комментарий сбрасывает кеш только страницы своего поста."""
+        detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.id}
+        )
+        home_response = self.guest_client.get(reverse('posts:home'))
+        self.guest_client.get(detail_url)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий'
+        )
+        self.assertContains(
+            self.guest_client.get(detail_url), 'Новый комментарий'
+        )
+        self.assertTemplateNotUsed(
+            self.guest_client.get(reverse('posts:home')), 'posts/index.html'
+        )
+        self.assertTemplateUsed(home_response, 'posts/index.html')
 
 
 class PaginatorViewsTest(TestCase):
@@ -252,3 +273,101 @@ class PaginatorViewsTest(TestCase):
                 kwargs={'username': self.user.username}) + '?page=2'
         )
         self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class CursorPaginatorViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Тестовый пост {i}')
+            for i in range(13)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_pages_cover_all_posts(self):
+        """Курсоры ведут по ленте без пропусков и повторов."""
+        url = reverse('posts:profile', kwargs={'username': 'test_user'})
+        first_page = self.client.get(url).context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        second_page = self.client.get(
+            url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        seen = [post.pk for post in first_page] + [
+            post.pk for post in second_page
+        ]
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+        back_page = self.client.get(
+            url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+
+    def test_broken_cursor_opens_first_page(self):
+        url = reverse('posts:profile', kwargs={'username': 'test_user'})
+        response = self.client.get(url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    @override_settings(PAGINATION_MODE='pages')
+    def test_numbered_mode_is_available(self):
+        url = reverse('posts:profile', kwargs={'username': 'test_user'})
+        page_obj = self.client.get(url).context['page_obj']
+        self.assertEqual(page_obj.number, 1)
+        self.assertEqual(page_obj.paginator.num_pages, 2)
+
+
+class CachedCountPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Тестовый пост {i}')
+            for i in range(95)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached_until_write(self):
+        CachedCountPaginator(Post.objects.all(), 10).page(1)
+        with CaptureQueriesContext(connection) as queries:
+            paginator = CachedCountPaginator(Post.objects.all(), 10)
+            paginator.page(1)
+        self.assertFalse(
+            [query for query in queries if 'COUNT(' in query['sql']]
+        )
+        self.assertEqual(paginator.count, 95)
+        Post.objects.create(author=self.user, text='Новый пост')
+        self.assertEqual(
+            CachedCountPaginator(Post.objects.all(), 10).count, 96
+        )
+
+    @override_settings(PAGINATOR_EXACT_COUNT_LIMIT=20)
+    def test_large_count_is_estimated(self):
+        paginator = CachedCountPaginator(Post.objects.all(), 10)
+        self.assertTrue(paginator.count > 20)
+        self.assertTrue(paginator.count_is_estimate)
+
+    def test_page_window_has_constant_size(self):
+        paginator = CachedCountPaginator(Post.objects.all(), 1)
+        self.assertEqual(
+            paginator.page(1).page_window, [1, 2, 3, '…', 95]
+        )
+        self.assertEqual(
+            paginator.page(50).page_window,
+            [1, '…', 48, 49, 50, 51, 52, '…', 95]
+        )
+        self.assertEqual(
+            paginator.page(95).page_window, [1, '…', 93, 94, 95]
+        )
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..write_queue import WriteQueue
+
+User = get_user_model()
+
+
+class RecordingQueue(WriteQueue):
+    def __init__(self, *args):
+        self.batches = []
+        super().__init__(*args)
+
+    def commit(self, batch):
+        self.batches.append(len(batch))
+        super().commit(batch)
+
+
+def create_group(slug):
+    return Group.objects.create(title=slug, slug=slug, description='')
+
+
+def fail():
+    create_group('rolled-back')
+    raise ValueError('Ошибка записи')
+
+
+# Поток-писатель видит только зафиксированные данные, поэтому тесты не
+# оборачиваются в транзакцию.
+class WriteQueueTests(TransactionTestCase):
+    def test_writes_are_grouped_and_errors_isolated(self):
+        write_queue = RecordingQueue(0.2, 100)
+        futures = [
+            write_queue.submit(create_group, 'first'),
+            write_queue.submit(fail),
+            write_queue.submit(create_group, 'second'),
+        ]
+        self.assertEqual(futures[0].result(5).slug, 'first')
+        with self.assertRaisesMessage(ValueError, 'Ошибка записи'):
+            futures[1].result(5)
+        self.assertEqual(futures[2].result(5).slug, 'second')
+        self.assertEqual(write_queue.batches, [3])
+        self.assertEqual(
+            sorted(Group.objects.values_list('slug', flat=True)),
+            ['first', 'second'],
+        )
+
+    def test_batch_size_is_limited(self):
+        write_queue = RecordingQueue(0.2, 2)
+        futures = [write_queue.submit(create_group, f'group-{i}')
+                   for i in range(3)]
+        for future in futures:
+            future.result(5)
+        self.assertEqual(write_queue.batches, [2, 1])
+
+    @override_settings(WRITE_QUEUE=True)
+    def test_views_write_through_queue(self):
+        user = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='Пост')
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse('posts:add_comment', args=[post.pk]),
+            {'text': 'Из очереди'},
+        )
+        self.assertRedirects(
+            response, reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertTrue(Comment.objects.filter(text='Из очереди').exists())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.client.get(reverse('posts:profile_follow', args=['author']))
+        self.assertTrue(
+            Follow.objects.filter(user=user, author=author).exists()
+        )
+        self.client.get(reverse('posts:profile_unfollow', args=['author']))
+        self.assertFalse(Follow.objects.exists())
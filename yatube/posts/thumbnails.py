@@ -0,0 +1,328 @@
+"""Подготовка вариантов картинок постов вне запроса.
+
+Раньше ``{% thumbnail %}`` декодировал, обрезал и кодировал картинку
+прямо во время рендеринга первой страницы после загрузки. Теперь
+картинка обрабатывается при сохранении поста: работа Pillow выполняется
+в пуле процессов, а запись в KV-хранилище sorl — в родительском
+процессе. Пока варианты не готовы, шаблон показывает заглушку.
+
+Для каждой картинки создаётся набор вариантов разной ширины в WebP и
+JPEG, из которых браузер выбирает подходящий по ``srcset``. Имена файлов
+строятся по SHA-256 содержимого исходника, поэтому одинаковые загрузки
+делят одни файлы, а готовый вариант никогда не перезаписывается.
+"""
+import hashlib
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import defaults as thumbnail_defaults
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from core.processes import setup_django
+
+from .caching import bump_generation
+from .storage import name_digest
+
+logger = logging.getLogger(__name__)
+
+# Пропорции кадра картинки поста и его обрезка.
+POST_ASPECT = (960, 339)
+POST_OPTIONS = {'crop': 'center', 'upscale': True}
+# Ширины вариантов; шире исходника варианты не создаются.
+VARIANT_WIDTHS = (320, 640, 960, 1920)
+# Форматы в порядке предпочтения и их качество.
+VARIANT_FORMATS = {'WEBP': 80, 'JPEG': 85}
+# Вариант для ``src`` у браузеров без поддержки srcset.
+FALLBACK_WIDTH = 960
+
+KV_IDENTITY = 'variants'
+
+_executor = None
+_scheduled = set()
+_lock = threading.Lock()
+
+
+class PostImage:
+    """Готовый набор вариантов картинки для шаблона."""
+
+    def __init__(self, variants):
+        self.variants = variants
+
+    def srcset(self, format_):
+        return ', '.join(
+            f'{default.storage.url(variant["name"])} {variant["width"]}w'
+            for variant in self.variants if variant['format'] == format_
+        )
+
+    @property
+    def webp_srcset(self):
+        return self.srcset('WEBP')
+
+    @property
+    def jpeg_srcset(self):
+        return self.srcset('JPEG')
+
+    @property
+    def fallback(self):
+        jpegs = [variant for variant in self.variants
+                 if variant['format'] == 'JPEG']
+        fitting = [variant for variant in jpegs
+                   if variant['width'] <= FALLBACK_WIDTH]
+        return (fitting or jpegs)[-1]
+
+    @property
+    def url(self):
+        return default.storage.url(self.fallback['name'])
+
+    @property
+    def width(self):
+        return self.fallback['width']
+
+    @property
+    def height(self):
+        return self.fallback['height']
+
+
+def variant_options(format_):
+    """Полные опции sorl для варианта, как их считает get_thumbnail."""
+    backend = default.backend
+    options = dict(POST_OPTIONS, format=format_,
+                   quality=VARIANT_FORMATS[format_])
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(thumbnail_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def variant_widths(source_width):
+    return [width for width in VARIANT_WIDTHS
+            if width <= source_width] or VARIANT_WIDTHS[:1]
+
+
+def variant_name(digest, geometry_string, format_):
+    extension = 'jpg' if format_ == 'JPEG' else format_.lower()
+    return (f'{thumbnail_settings.THUMBNAIL_PREFIX}variants/'
+            f'{digest[:2]}/{digest}_{geometry_string}.{extension}')
+
+
+def file_digest(name):
+    content_digest = name_digest(name)
+    if content_digest:
+        return content_digest
+    digest = hashlib.sha256()
+    with default.storage.open(name) as source_file:
+        for chunk in source_file.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def render_variants(source_name):
+    """Создаёт файлы вариантов; выполняется в процессе пула.
+
+    Исходник декодируется один раз на все варианты. Возвращает список
+    вариантов — его родительский процесс запишет в KV-хранилище.
+    """
+    digest = file_digest(source_name)
+    source = ImageFile(source_name)
+    source_image = default.engine.get_image(source)
+    variants = []
+    try:
+        image_info = default.engine.get_image_info(source_image)
+        source_width, _ = default.engine.get_image_size(source_image)
+        for width in variant_widths(source_width):
+            height = round(width * POST_ASPECT[1] / POST_ASPECT[0])
+            geometry_string = f'{width}x{height}'
+            for format_ in VARIANT_FORMATS:
+                variant = ImageFile(
+                    variant_name(digest, geometry_string, format_),
+                    default.storage,
+                )
+                if variant.exists():
+                    variant.set_size()
+                else:
+                    options = variant_options(format_)
+                    options['image_info'] = image_info
+                    default.backend._create_thumbnail(
+                        source_image, geometry_string, options, variant
+                    )
+                variants.append({
+                    'format': format_,
+                    'width': variant.width,
+                    'height': variant.height,
+                    'name': variant.name,
+                })
+    finally:
+        default.engine.cleanup(source_image)
+    return variants
+
+
+def render_post_variants(source_name):
+    """Варианты для пакетной обработки; ошибка не прерывает пакет."""
+    try:
+        return render_variants(source_name)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', source_name)
+        return None
+
+
+def find_many_variants(source_names):
+    """{имя: готовые варианты или None} для многих картинок сразу.
+
+    Вместо обращения к KV-хранилищу на каждую картинку делается один
+    ``get_many`` к кешу и для промахов — один запрос к KVStore; найденное
+    в базе возвращается в кеш одним ``set_many``. Ничего не создаёт.
+
+    В отличие от ``kvstore._get`` промах не кешируется: иначе варианты,
+    записанные фоновым процессом, ещё долго считались бы отсутствующими.
+    """
+    keys = {add_prefix(name, KV_IDENTITY): name for name in source_names}
+    kv_cache = default.kvstore.cache
+    values = {
+        key: value for key, value in kv_cache.get_many(keys).items()
+        if isinstance(value, str) and value
+    }
+    missing = keys.keys() - values.keys()
+    if missing:
+        found = dict(
+            KVStore.objects.filter(key__in=missing).values_list('key', 'value')
+        )
+        if found:
+            kv_cache.set_many(
+                found, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+        values.update(found)
+    return {
+        name: PostImage(deserialize(values[key])) if key in values else None
+        for key, name in keys.items()
+    }
+
+
+def find_variants(source_name):
+    """Готовые варианты картинки или None; ничего не создаёт."""
+    return find_many_variants([source_name])[source_name]
+
+
+def store_variants(source_name, variants):
+    """Регистрирует готовые варианты в KV-хранилище sorl."""
+    default.kvstore._set(source_name, variants, identity=KV_IDENTITY)
+    # Закешированные страницы ещё показывают заглушку.
+    bump_generation('posts')
+
+
+def delete_variants(source_name):
+    """Удаляет файлы вариантов картинки и их запись в KV-хранилище."""
+    variants = default.kvstore._get(source_name, identity=KV_IDENTITY)
+    for variant in variants or ():
+        default.storage.delete(variant['name'])
+    default.kvstore._delete(source_name, identity=KV_IDENTITY)
+
+
+def generate_variants(source_name):
+    """Синхронно создаёт и регистрирует варианты картинки."""
+    store_variants(source_name, render_variants(source_name))
+    return find_variants(source_name)
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=setup_django,
+            )
+        return _executor
+
+
+def reset_executor():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def finish(source_name, future):
+    """Дописывает результат пула; вызывается в потоке родителя."""
+    try:
+        store_variants(source_name, future.result())
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', source_name)
+    finally:
+        with _lock:
+            _scheduled.discard(source_name)
+        connections.close_all()
+
+
+def schedule_variants(source_name):
+    """Отдаёт картинку пулу процессов, если она ещё не заказана."""
+    if not settings.THUMBNAIL_BACKGROUND:
+        generate_variants(source_name)
+        return
+    with _lock:
+        if source_name in _scheduled:
+            return
+        _scheduled.add(source_name)
+    try:
+        future = get_executor().submit(render_variants, source_name)
+    except BrokenProcessPool:
+        logger.exception('Пул обработки картинок сломан и будет создан заново')
+        reset_executor()
+        with _lock:
+            _scheduled.discard(source_name)
+        return
+    future.add_done_callback(partial(finish, source_name))
+
+
+def schedule_post_thumbnails(post):
+    """Заказывает варианты картинки поста после фиксации транзакции."""
+    if post.image:
+        name = post.image.name
+        transaction.on_commit(lambda: schedule_variants(name))
+
+
+def post_images(images):
+    """Варианты для шаблона: готовые, заказанные (None) или синхронные."""
+    names = [image.name for image in images if image]
+    found = find_many_variants(names)
+    for name, variants in found.items():
+        if variants is not None:
+            continue
+        if not settings.THUMBNAIL_BACKGROUND:
+            found[name] = generate_variants(name)
+        else:
+            transaction.on_commit(partial(schedule_variants, name))
+    return found
+
+
+def post_image(image):
+    if not image:
+        return None
+    return post_images([image])[image.name]
+
+
+def prefetch_post_images(posts):
+    """Разом находит варианты картинок постов страницы.
+
+    Результат кладётся в ``post.prefetched_image``, откуда его берёт
+    тег ``post_picture``.
+    """
+    posts = list(posts)
+    found = post_images(post.image for post in posts)
+    for post in posts:
+        post.prefetched_image = found.get(post.image.name)
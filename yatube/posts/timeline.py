@@ -0,0 +1,109 @@
+"""Материализованная лента подписок (fan-out-on-write).
+
+Каждый новый пост сразу раскладывается по строкам ``TimelineEntry``
+всех подписчиков автора, поэтому ``follow_index`` читает ленту одним
+запросом по индексу (user, -pub_date) без соединения Follow и Post.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, IntegerField, Value, Window
+from django.db.models.functions import RowNumber
+
+from .models import Follow, Post, TimelineEntry
+
+
+def fan_out_post(post):
+    """Добавляет пост в ленты всех подписчиков его автора."""
+    followers = Follow.objects.filter(author_id=post.author_id)
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.values_list('user_id', flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+    trim_timelines(followers.values('user_id'),
+                   slack=settings.TIMELINE_TRIM_SLACK)
+
+
+def add_author(user_id, author_id):
+    """Заполняет ленту свежими постами автора после подписки.
+
+    Посты копируются одним INSERT ... SELECT, без чтения их в Python.
+    """
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .annotate(reader=Value(user_id, output_field=IntegerField()))
+        .order_by('-pub_date', '-pk')
+        .values_list('reader', 'pk', 'pub_date')
+        [:settings.TIMELINE_MAX_LENGTH]
+    )
+    sql, params = posts.query.sql_with_params()
+    ops = connection.ops
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{ops.insert_statement(ignore_conflicts=True)} '
+            f'{ops.quote_name(TimelineEntry._meta.db_table)} '
+            f'(user_id, post_id, pub_date) '
+            f'SELECT reader, id, pub_date FROM ({sql}) posts '
+            f'{ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+            params,
+        )
+    trim_timelines([user_id])
+
+
+def remove_author(user_id, author_id):
+    """Убирает посты автора из ленты после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def trim_timelines(user_ids, slack=0):
+    """Обрезает до TIMELINE_MAX_LENGTH строк ленты длиннее его на ``slack``.
+
+    Все ленты обрезаются одним DELETE: ROW_NUMBER() нумерует строки
+    каждой ленты по индексу (user, pub_date, post) от новых к старым.
+    Нумеруются только ленты, в которых строк больше предела, остальные
+    лишь считаются по тому же индексу. ``user_ids`` — список или
+    подзапрос, например подписчики автора.
+    """
+    limit = settings.TIMELINE_MAX_LENGTH
+    overflowing = (
+        TimelineEntry.objects.filter(user_id__in=user_ids)
+        .values('user_id')
+        .annotate(total=Count('pk'))
+        .filter(total__gt=limit + slack)
+        .values('user_id')
+    )
+    ranked = (
+        TimelineEntry.objects.filter(user_id__in=overflowing)
+        .annotate(position=Window(
+            RowNumber(), partition_by=[F('user_id')],
+            order_by=[F('pub_date').desc(), F('post_id').desc()],
+        ))
+        .order_by()
+        .values('pk', 'position')
+    )
+    sql, params = ranked.query.sql_with_params()
+    table = connection.ops.quote_name(TimelineEntry._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE id IN ('
+            f'SELECT id FROM ({sql}) ranked WHERE position > %s)',
+            [*params, limit],
+        )
+
+
+def rebuild_timeline(user_id):
+    """Пересобирает ленту пользователя по его текущим подпискам."""
+    TimelineEntry.objects.filter(user_id=user_id).delete()
+    posts = (
+        Post.objects.filter(author__following__user_id=user_id)
+        .order_by('-pub_date', '-pk')
+        .values_list('pk', 'pub_date')[:settings.TIMELINE_MAX_LENGTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    )
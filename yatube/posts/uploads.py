@@ -0,0 +1,187 @@
+"""Обработка загруженных картинок постов с ограниченной памятью.
+
+Загрузка пишется во временный файл (FILE_UPLOAD_HANDLERS), а не в
+память. Картинка, в которой больше IMAGE_MAX_PIXELS пикселей, сразу
+отклоняется как «бомба распаковки»: размер известен из заголовка, до
+декодирования. JPEG декодируется через ``draft`` сразу в уменьшенном
+в 2, 4 или 8 раз виде, затем ``reduce`` и ``resize`` доводят его до
+IMAGE_MAX_SIZE по длинной стороне. Форматы без draft нельзя
+декодировать больше IMAGE_MAX_DECODED_PIXELS за раз. Поворот из EXIF
+применяется к уже уменьшенной картинке, а сами метаданные EXIF (вместе
+с GPS) не сохраняются.
+
+Анимации (GIF, APNG, WebP) перекодируются покадрово: кадр декодируется
+по одному, а в памяти копятся только уменьшенные кадры. Анимация, все
+уменьшенные кадры которой больше IMAGE_MAX_DECODED_PIXELS, отклоняется.
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, ImageOps, ImageSequence
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 90},
+}
+# Форматы, у которых Pillow умеет декодировать сразу уменьшенную копию.
+DRAFT_FORMATS = ('JPEG', 'MPO')
+STRIPPED_INFO = ('exif', 'xmp', 'XML:com.adobe.xmp', 'photoshop')
+# Кадры сохраняются целиком, поэтому каждый заменяет предыдущий.
+ANIMATION_OPTIONS = {
+    'GIF': {'disposal': 2},
+    'PNG': {'disposal': 1, 'blend': 0},
+}
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """Временный файл, SHA-256 которого посчитан по мере записи.
+
+    Хеш попадает в ``file.sha256``, и posts.storage не перечитывает
+    загрузку, если она сохраняется без изменений, как в админке. PostForm
+    перекодирует картинку, и хеш копии ``process_image`` считает сам по
+    байтам в памяти; для формы остаётся только запись во временный файл.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.digest.hexdigest()
+        return file
+
+
+def fit(size, max_size):
+    """Размер, вписанный в квадрат max_size (не больше исходного)."""
+    width, height = size
+    scale = min(1, max_size / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def check_pixels(size, limit, message):
+    width, height = size
+    if width * height > limit:
+        raise ValidationError(message, code='image_too_large')
+
+
+def check_frames(size, frames, limit, message):
+    """Все ``frames`` кадров размера ``size`` вместе не больше ``limit``."""
+    width, height = size
+    if width * height * frames > limit:
+        raise ValidationError(message, code='image_too_large')
+
+
+def decode(image):
+    """Загружает пиксели, по возможности сразу в уменьшенном виде."""
+    target = fit(image.size, settings.IMAGE_MAX_SIZE)
+    if image.format in DRAFT_FORMATS:
+        image.draft(image.mode, target)
+    check_pixels(
+        image.size, settings.IMAGE_MAX_DECODED_PIXELS,
+        'Картинка слишком большая: сохраните её в JPEG или уменьшите.',
+    )
+    image.load()
+    target = fit(image.size, settings.IMAGE_MAX_SIZE)
+    if image.size == target:
+        return image
+    if image.mode in ('1', 'P'):
+        # Палитру нельзя усреднять: масштабируем полноцветную копию.
+        image = image.convert(
+            'RGBA' if 'transparency' in image.info else 'RGB'
+        )
+    factor = min(image.width // target[0], image.height // target[1])
+    if factor > 1:
+        image = image.reduce(factor)
+    if image.size != target:
+        image = image.resize(target, Image.LANCZOS)
+    return image
+
+
+def output_format(image):
+    if image.format == 'MPO':
+        return 'JPEG'
+    return image.format if image.format in Image.SAVE else 'PNG'
+
+
+def animation_frames(image):
+    """Уменьшенные кадры анимации и их длительности."""
+    check_pixels(
+        image.size, settings.IMAGE_MAX_DECODED_PIXELS,
+        'Кадр анимации слишком большой.',
+    )
+    target = fit(image.size, settings.IMAGE_MAX_SIZE)
+    check_frames(
+        target, image.n_frames, settings.IMAGE_MAX_DECODED_PIXELS,
+        'Анимация слишком большая: уменьшите её или сократите число '
+        'кадров.',
+    )
+    frames, durations = [], []
+    for frame in ImageSequence.Iterator(image):
+        durations.append(frame.info.get('duration', 100))
+        frame = frame.convert('RGBA')
+        if frame.size != target:
+            frame = frame.resize(target, Image.LANCZOS)
+        frame.info = {}
+        frames.append(frame)
+    return frames, durations
+
+
+def save_animation(image, fmt):
+    frames, durations = animation_frames(image)
+    buffer = BytesIO()
+    frames[0].save(
+        buffer, fmt, save_all=True, append_images=frames[1:],
+        duration=durations, loop=image.info.get('loop', 0),
+        **SAVE_OPTIONS.get(fmt, {}), **ANIMATION_OPTIONS.get(fmt, {}),
+    )
+    return buffer
+
+
+def save_still(image, fmt):
+    result = ImageOps.exif_transpose(decode(image))
+    for key in STRIPPED_INFO:
+        result.info.pop(key, None)
+    if fmt == 'JPEG' and result.mode not in ('RGB', 'L'):
+        result = result.convert('RGB')
+    buffer = BytesIO()
+    result.save(buffer, fmt, **SAVE_OPTIONS.get(fmt, {}))
+    return buffer
+
+
+def process_image(upload):
+    """Уменьшенная копия загрузки без EXIF или ValidationError.
+
+    SHA-256 копии сразу записывается в ``sha256`` для posts.storage.
+    """
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except Image.DecompressionBombError:
+        raise ValidationError('Картинка слишком большая.',
+                              code='image_too_large')
+    with image:
+        check_pixels(image.size, settings.IMAGE_MAX_PIXELS,
+                     'Картинка слишком большая.')
+        fmt = output_format(image)
+        if fmt != 'JPEG' and getattr(image, 'is_animated', False):
+            buffer = save_animation(image, fmt)
+        else:
+            buffer = save_still(image, fmt)
+    name = os.path.basename(upload.name)
+    if fmt != image.format and image.format != 'MPO':
+        name = f'{os.path.splitext(name)[0]}.{fmt.lower()}'
+    data = buffer.getvalue()
+    result = ContentFile(data, name=name)
+    result.sha256 = hashlib.sha256(data).hexdigest()
+    return result
@@ -1,9 +1,235 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import hashlib
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
-def paginator(request, queryset):
-    quantity = 10
-    paginator = Paginator(queryset, quantity)
+from .caching import get_generations
+
+POSTS_PER_PAGE = 10
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+def encode_cursor(direction, pub_date, pk):
+    """Упаковывает позицию в ленте в непрозрачную строку для URL."""
+    raw = f'{direction}|{pub_date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (direction, pub_date, pk) или None для битого курсора."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or pub_date is None:
+        return None
+    return direction, pub_date, pk
+
+
+def keyset_after(queryset, position, date_field='pub_date', id_field='pk'):
+    """Выборка от новых к старым, начиная после (pub_date, id)."""
+    if position is not None:
+        pub_date, pk = position
+        queryset = queryset.filter(
+            **{f'{date_field}__lte': pub_date}
+        ).exclude(
+            **{date_field: pub_date, f'{id_field}__gte': pk}
+        )
+    return queryset.order_by(f'-{date_field}', f'-{id_field}')
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id) без COUNT(*) и OFFSET.
+
+    Каждая страница — это один запрос вида
+    ``WHERE pub_date <= ? AND NOT (pub_date = ? AND id >= ?)
+    ORDER BY pub_date DESC, id DESC LIMIT per_page + 1``,
+    который идёт по индексу pub_date (для автора и группы — по составным
+    индексам с pub_date) и не зависит от глубины страницы.
+    ``keys`` задаёт имена полей даты и идентификатора в выборке.
+
+    Страницы — обычные ``Page``: номер 1 означает начало ленты, а
+    ``num_pages`` описывает только соседей текущей страницы, так что
+    ``has_next``/``has_previous`` работают без подсчёта записей.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'pk')):
+        super().__init__(object_list, per_page)
+        self.date_field, self.id_field = keys
+
+    def get_page(self, cursor):
+        position = decode_cursor(cursor)
+        if position is None:
+            return self._page_after(None)
+        direction, pub_date, pk = position
+        if direction == CURSOR_PREVIOUS:
+            return self._page_before(pub_date, pk)
+        return self._page_after((pub_date, pk))
+
+    def cursor_for(self, direction, item):
+        return encode_cursor(
+            direction,
+            getattr(item, self.date_field),
+            getattr(item, self.id_field),
+        )
+
+    def _page_after(self, position):
+        items = list(keyset_after(
+            self.object_list, position, self.date_field, self.id_field
+        )[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        return self.build_page(
+            items,
+            has_next=has_more,
+            has_previous=position is not None and bool(items),
+        )
+
+    def _page_before(self, pub_date, pk):
+        queryset = self.object_list.filter(
+            **{f'{self.date_field}__gte': pub_date}
+        ).exclude(
+            **{self.date_field: pub_date, f'{self.id_field}__lte': pk}
+        )
+        items = list(queryset.order_by(
+            self.date_field, self.id_field
+        )[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page][::-1]
+        if not items:
+            return self._page_after(None)
+        return self.build_page(items, has_next=True, has_previous=has_more)
+
+    def build_page(self, items, has_next, has_previous):
+        """Собирает страницу из готового списка объектов ленты."""
+        number = 2 if items and has_previous else 1
+        self.num_pages = number + 1 if items and has_next else number
+        page = Page(items, number, self)
+        page.next_cursor = page.previous_cursor = None
+        if page.has_next():
+            page.next_cursor = self.cursor_for(CURSOR_NEXT, items[-1])
+        if page.has_previous():
+            page.previous_cursor = self.cursor_for(CURSOR_PREVIOUS, items[0])
+        return page
+
+
+class CachedCountPaginator(Paginator):
+    """Нумерованная пагинация с кешированным и оценочным COUNT(*).
+
+    Число записей кешируется по SQL выборки и поколениям ``scopes``,
+    поэтому пересчитывается только после записи. Точно считаются не
+    больше PAGINATOR_EXACT_COUNT_LIMIT строк; для больших выборок число
+    оценивается по плотности id среди первых строк. Навигация строится
+    по окну ``page_window`` постоянного размера.
+    """
+
+    ELLIPSIS = '…'
+    on_each_side = 2
+    on_ends = 1
+
+    def __init__(self, object_list, per_page, scopes=('posts',)):
+        super().__init__(object_list, per_page)
+        self.scopes = scopes
+
+    @cached_property
+    def count_and_estimate(self):
+        sql, params = self.object_list.query.sql_with_params()
+        digest = hashlib.md5(repr((sql, params)).encode()).hexdigest()
+        generations = '.'.join(map(str, get_generations(self.scopes)))
+        key = f'posts:count:{generations}:{digest}'
+        result = cache.get(key)
+        if result is None:
+            result = self.bounded_count()
+            cache.set(key, result, settings.CACHE_TIME)
+        return result
+
+    @cached_property
+    def count(self):
+        return self.count_and_estimate[0]
+
+    @property
+    def count_is_estimate(self):
+        if 'count_and_estimate' not in self.__dict__:
+            return False
+        return self.count_and_estimate[1]
+
+    def bounded_count(self):
+        limit = settings.PAGINATOR_EXACT_COUNT_LIMIT
+        # Без ORDER BY SQLite считает строки по самому узкому индексу.
+        count = self.object_list.order_by()[:limit + 1].count()
+        queryset = self.object_list.order_by('-pk')
+        if count <= limit:
+            return count, False
+        newest = queryset.values_list('pk', flat=True).first()
+        oldest = queryset.order_by('pk').values_list('pk', flat=True).first()
+        boundary = queryset.values_list('pk', flat=True)[limit]
+        span = max(newest - boundary, 1)
+        return limit * (newest - oldest + 1) // span, True
+
+    def page(self, number):
+        page = super().page(number)
+        page.page_window = list(self.get_elided_page_range(page.number))
+        return page
+
+    def get_elided_page_range(self, number):
+        """Номера страниц вокруг текущей, пропуски обозначены ELLIPSIS."""
+        window_start = max(number - self.on_each_side, 1)
+        window_end = min(number + self.on_each_side, self.num_pages)
+        if window_start > self.on_ends + 2:
+            yield from range(1, self.on_ends + 1)
+            yield self.ELLIPSIS
+        else:
+            window_start = 1
+        yield from range(window_start, window_end + 1)
+        if self.count_is_estimate:
+            if window_end < self.num_pages:
+                yield self.ELLIPSIS
+            return
+        if window_end < self.num_pages - self.on_ends - 1:
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - self.on_ends + 1,
+                             self.num_pages + 1)
+        else:
+            yield from range(window_end + 1, self.num_pages + 1)
+
+
+def cursor_requested(request):
+    """Нужна ли для запроса keyset-страница, а не нумерованная."""
+    return (settings.PAGINATION_MODE == 'cursor'
+            and request.GET.get('page') is None)
+
+
+def paginator(request, queryset, keys=('pub_date', 'pk'), count=None,
+              scopes=('posts',)):
+    """Страница ленты для шаблона posts/includes/paginator.html.
+
+    В режиме ``PAGINATION_MODE = 'cursor'`` используется keyset-пагинация,
+    но старые ссылки вида ``?page=N`` по-прежнему открываются
+    нумерованным Paginator. Заранее известный ``count`` избавляет
+    нумерованный режим от ``COUNT(*)``, а ``scopes`` — поколения, после
+    смены которых закешированное число записей устаревает.
+    """
     page_number = request.GET.get('page')
+    if cursor_requested(request):
+        cursor_paginator = CursorPaginator(queryset, POSTS_PER_PAGE, keys)
+        return cursor_paginator.get_page(request.GET.get('cursor'))
+    paginator = CachedCountPaginator(queryset, POSTS_PER_PAGE, scopes)
+    if count is not None:
+        paginator.count = count
     page_obj = paginator.get_page(page_number)
     return page_obj
@@ -1,13 +1,26 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, StreamingHttpResponse
 from .forms import PostForm, CommentForm
 from .models import Post, Group, User, Follow
 from django.contrib.auth.decorators import login_required
 from .utils import paginator
-from django.views.decorators.cache import cache_page
+from .merge_feed import merged_feed_page
+from .caching import cache_page_by_generation
+from .conditional import (conditional_page, group_modified, post_modified,
+                          profile_modified)
+from .counters import get_counters
+from .thumbnails import schedule_post_thumbnails
+from .search import search_posts
+from . import export as content_export
+from .write_queue import write
 from django.conf import settings
 
+PROFILE_SCOPES = ('posts', lambda username: f'profile:{username}')
+POST_SCOPES = ('posts', lambda post_id: f'post:{post_id}')
 
-@cache_page(settings.CACHE_TIME)
+
+@cache_page_by_generation(settings.CACHE_TIME, 'posts')
 def index(request):
     post_list = (Post.objects.select_related('author')
                  .select_related('group').all())
@@ -19,9 +32,11 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_modified, 'posts')
+@cache_page_by_generation(settings.CACHE_TIME, 'posts')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.select_related('author')
     page_obj = paginator(request, posts)
     context = {
         'group': group,
@@ -30,25 +45,39 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(profile_modified, *PROFILE_SCOPES)
+@cache_page_by_generation(settings.CACHE_TIME, *PROFILE_SCOPES)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    author_posts = author.posts.all()
-    page_obj = paginator(request, author_posts)
-    post_count = author_posts.count()
+    author = get_object_or_404(User.objects.select_related('counters'),
+                               username=username)
+    counters = get_counters(author)
+    author_posts = author.posts.select_related('group')
+    if settings.FOLLOW_FEED_ENGINE == 'merge':
+        page_obj = merged_feed_page(request, [author.pk])
+    else:
+        page_obj = paginator(request, author_posts,
+                             count=counters.posts_count)
     context = {
         'author': author,
-        'post_count': post_count,
+        'post_count': counters.posts_count,
+        'followers_count': counters.followers_count,
+        'following_count': counters.following_count,
         'page_obj': page_obj,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_modified, *POST_SCOPES)
+@cache_page_by_generation(settings.CACHE_TIME, *POST_SCOPES)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    post_count = post.author.posts.count()
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'),
+        pk=post_id
+    )
+    post_count = get_counters(post.author).posts_count
     title = post.text[:30]
     form = CommentForm()
-    comments = post.comments.all()
+    comments = post.comments.select_related('author')
     context = {
         'title': title,
         'post_count': post_count,
@@ -67,6 +96,7 @@ def create_post(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_post_thumbnails(post)
         return redirect('posts:profile', post.author.username)
 
     context = {
@@ -78,7 +108,7 @@ def create_post(request):
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if request.user != post.author:
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
         request.POST or None,
@@ -87,6 +117,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         post = form.save()
+        if 'image' in form.changed_data:
+            schedule_post_thumbnails(post)
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -103,31 +135,77 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        write(comment.save)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = paginator(request, posts)
+    if settings.FOLLOW_FEED_ENGINE == 'merge':
+        author_ids = request.user.follower.values_list('author_id', flat=True)
+        page_obj = merged_feed_page(request, author_ids)
+    else:
+        entries = (request.user.timeline
+                   .select_related('post__author', 'post__group'))
+        page_obj = paginator(
+            request, entries, keys=('pub_date', 'post_id'),
+            scopes=('posts', f'follows:{request.user.pk}')
+        )
+        page_obj.object_list = [entry.post for entry in page_obj.object_list]
     context = {
         'page_obj': page_obj
     }
     return render(request, 'posts/follow.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    cursor = request.GET.get('cursor')
+    posts, next_cursor = search_posts(query, cursor)
+    context = {
+        'query': query,
+        'posts': posts,
+        'cursor': cursor,
+        'next_cursor': next_cursor,
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@staff_member_required
+def export(request, kind):
+    if kind not in content_export.EXPORTS:
+        raise Http404
+    fmt = request.GET.get('format', 'jsonl')
+    if fmt not in content_export.FORMATS:
+        fmt = 'jsonl'
+    compress = request.GET.get('gzip') == '1'
+    chunks = content_export.export_chunks(
+        kind, fmt, compress,
+        author=request.GET.get('author'),
+        group=request.GET.get('group'),
+    )
+    response = StreamingHttpResponse(
+        chunks,
+        content_type=('application/gzip' if compress
+                      else content_export.CONTENT_TYPES[fmt]),
+    )
+    filename = content_export.export_filename(kind, fmt, compress)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        write(Follow.objects.get_or_create, user=request.user, author=author)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    follow = Follow.objects.filter(user=request.user, author=author)
-    follow.delete()
+    for follow in Follow.objects.filter(user=request.user, author=author):
+        follow.user, follow.author = request.user, author
+        write(follow.delete)
     return redirect('posts:profile', username=username)
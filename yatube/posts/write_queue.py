@@ -0,0 +1,109 @@
+"""Общая очередь мелких записей процесса (WRITE_QUEUE).
+
+В SQLite пишущий в каждый момент один, поэтому комментарии и подписки
+из разных потоков воркера стоят в очереди за блокировкой базы, а каждая
+их транзакция отдельно фиксируется. Если WRITE_QUEUE включена, запрос
+кладёт запись в очередь процесса и ждёт её Future. Один поток-писатель
+собирает записи, пришедшие за WRITE_QUEUE_DELAY секунд (не больше
+WRITE_QUEUE_BATCH), и фиксирует их одной транзакцией. Каждая запись
+выполняется в своей точке сохранения: ошибка одной откатывает только её
+и поднимается в её запросе. Future завершается после фиксации, поэтому
+ответ, как и раньше, уходит только после того, как запись сохранена.
+
+Внутри транзакции вызывающего запись выполняется сразу: поток-писатель
+не видит её незафиксированных данных.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+_writer = None
+_lock = threading.Lock()
+
+
+class WriteQueue:
+    def __init__(self, delay, batch_size):
+        self.delay = delay
+        self.batch_size = batch_size
+        self.queue = queue.SimpleQueue()
+        self.pid = os.getpid()
+        self.thread = threading.Thread(
+            target=self.loop, name='write-queue', daemon=True
+        )
+        self.thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        self.queue.put((future, func, args, kwargs))
+        return future
+
+    def loop(self):
+        while True:
+            batch = self.collect()
+            try:
+                self.commit(batch)
+            except Exception:
+                logger.exception('Не удалось записать пачку из очереди')
+                connection.close()
+
+    def collect(self):
+        """Первая запись и все, что успели прийти за ``delay``."""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.delay
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def commit(self, batch):
+        try:
+            with transaction.atomic():
+                results = [self.apply(*item[1:]) for item in batch]
+        except Exception as error:
+            for future, *_ in batch:
+                future.set_exception(error)
+            raise
+        for (future, *_), (result, error) in zip(batch, results):
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    @staticmethod
+    def apply(func, args, kwargs):
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs), None
+        except Exception as error:
+            return None, error
+
+
+def get_queue():
+    global _writer
+    with _lock:
+        # После fork поток-писатель остался в родителе.
+        if _writer is None or _writer.pid != os.getpid():
+            _writer = WriteQueue(settings.WRITE_QUEUE_DELAY,
+                                 settings.WRITE_QUEUE_BATCH)
+        return _writer
+
+
+def write(func, *args, **kwargs):
+    """Выполняет запись и возвращает её результат после фиксации."""
+    if not settings.WRITE_QUEUE or connection.in_atomic_block:
+        return func(*args, **kwargs)
+    future = get_queue().submit(func, *args, **kwargs)
+    return future.result(settings.WRITE_QUEUE_TIMEOUT)
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
@@ -91,6 +92,11 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     }
 }
+# Отдельное соединение для чтений включает профиль settings_production.
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+# PRAGMA каждого нового соединения с SQLite (core.db). Для разработки и
+# тестов — настройки SQLite по умолчанию; свои задаёт settings_production.
+SQLITE_PRAGMAS = {}
 
 
 # Password validation
@@ -131,6 +137,12 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+# collectstatic пишет сюда файлы с хешем в имени и их .gz/.br копии,
+# а отдаёт их core.staticfiles.StaticFilesMiddleware (см. wsgi.py).
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+STATICFILES_STORAGE = (
+    'core.staticfiles.CompressedManifestStaticFilesStorage'
+)
 
 
 LOGIN_URL = 'users:login'
@@ -144,10 +156,73 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Кто отдаёт байты файлов из MEDIA_ROOT (см. core.media): None — сам
+# Django через wsgi.file_wrapper, 'x-accel-redirect' — nginx по
+# внутреннему location MEDIA_ACCEL_REDIRECT_PREFIX, 'x-sendfile' —
+# Apache или lighttpd.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected-media/'
+
+# Загрузки всегда пишутся во временный файл, а не в память; по пути
+# считается их SHA-256 для posts.storage (нужен загрузкам, которые
+# сохраняются без перекодирования, например из админки).
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.HashingUploadHandler',
+]
+# Картинки постов (posts.uploads): длинная сторона после уменьшения
+# (шире самого широкого варианта posts.thumbnails хранить незачем),
+# предел пикселей оригинала и предел одновременно декодируемых пикселей
+# (JPEG декодируется сразу уменьшенным, поэтому ему хватает и меньшего).
+IMAGE_MAX_SIZE = 1920
+IMAGE_MAX_PIXELS = 50_000_000
+IMAGE_MAX_DECODED_PIXELS = 12_000_000
+# Картинку, которую загружали за последний час, не удаляем: пост с ней
+# может быть ещё не зафиксирован (см. posts.storage).
+IMAGE_DELETE_GRACE = 60 * 60
 
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        # Списки свежих постов авторов живут в кеше постоянно, поэтому
+        # стандартного лимита в 300 записей не хватает.
+        'OPTIONS': {'MAX_ENTRIES': 100000},
     }
 }
-CACHE_TIME = 20
+# Страницы лент сбрасываются сигналами записи (posts.caching), поэтому
+# их можно держать в кеше долго.
+CACHE_TIME = 60 * 60 * 6
+
+# 'cursor' — keyset-пагинация лент по (pub_date, id), 'pages' — нумерованная.
+PAGINATION_MODE = 'cursor'
+
+# Очередь записей (posts.write_queue): комментарии и подписки фиксирует
+# пачками один поток процесса. Пачка собирается WRITE_QUEUE_DELAY секунд
+# и не больше чем из WRITE_QUEUE_BATCH записей.
+WRITE_QUEUE = False
+WRITE_QUEUE_DELAY = 0.001
+WRITE_QUEUE_BATCH = 100
+WRITE_QUEUE_TIMEOUT = 10
+
+# Сколько последних постов хранится в ленте подписок одного пользователя.
+# Новые посты обрезают ленту, только когда она длиннее на
+# TIMELINE_TRIM_SLACK строк, так что обрезка случается раз в столько постов.
+TIMELINE_MAX_LENGTH = 1000
+TIMELINE_TRIM_SLACK = 100
+
+# Движок ленты подписок: 'timeline' — материализованная лента,
+# 'merge' — слияние списков свежих постов авторов из кеша.
+FOLLOW_FEED_ENGINE = 'timeline'
+RECENT_POSTS_PER_AUTHOR = 200
+
+# До какого числа строк нумерованный пагинатор считает записи точно.
+PAGINATOR_EXACT_COUNT_LIMIT = 10000
+
+# Миниатюры картинок постов готовятся в фоновом пуле процессов.
+THUMBNAIL_BACKGROUND = True
+THUMBNAIL_WORKERS = 2
+
+# Поиск: 'fts5' — таблица SQLite FTS5, 'index' — инвертированный индекс
+# в файлах (для баз без FTS5), см. posts.inverted_index.
+SEARCH_BACKEND = 'fts5'
+SEARCH_INDEX_PATH = os.path.join(BASE_DIR, 'search_index', 'posts.idx')
+SEARCH_INDEX_JOURNAL_LIMIT = 1024 * 1024
@@ -0,0 +1,28 @@
+"""Профиль продакшена: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+
+Соединения с SQLite получают PRAGMA из SQLITE_PRAGMAS (core.db). Чтения
+идут через отдельное соединение к тому же файлу SQLite, открытое только
+для чтения (core.db.ReplicaRouter), записи — через основное.
+"""
+from urllib.parse import quote
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+DATABASES = {
+    **DATABASES,
+    'replica': {
+        **DATABASES['default'],
+        'NAME': f'file:{quote(DATABASES["default"]["NAME"])}?mode=ro',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    # Отрицательный cache_size — в КиБ: 64 МиБ кеша страниц на соединение.
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+from core.staticfiles import StaticFilesMiddleware  # noqa: E402
+
+application = StaticFilesMiddleware(application)